@@ -1,16 +1,22 @@
 from .core import agent_answer
 from .open_work import open_work_handler
 from .text_to_sql import text_to_sql_handler
+from .search import search_notes_handler
 from .tools import Tool, TOOLS, register_tool, get_tools_for_openai
 from .daily_suggestions import get_daily_suggestions
+from .prefetch import Prefetcher
+from .default_tools import register_default_tools
 
 __all__ = [
     'agent_answer',
     'open_work_handler',
     'text_to_sql_handler',
+    'search_notes_handler',
     'Tool',
     'TOOLS',
     'register_tool',
     'get_tools_for_openai',
-    'get_daily_suggestions'
+    'get_daily_suggestions',
+    'Prefetcher',
+    'register_default_tools'
 ]
\ No newline at end of file
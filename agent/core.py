@@ -1,14 +1,14 @@
 import json
 import streamlit as st
-from openai import OpenAI
 from typing import Dict, Any
 from .tools import TOOLS, get_tools_for_openai
+from database import CancelToken, QueryCancelled, query_scope, tagged
+from .routing import chat_completion
 
-def get_openai_client():
-    """Initialize and return an OpenAI client"""
-    return OpenAI()
+STOPPED_MESSAGE = "Stopped before finishing; ask again to re-run."
 
-def agent_answer(user_question: str, max_iterations: int = 5) -> str:
+def agent_answer(user_question: str, max_iterations: int = 5,
+                 cancel_token: CancelToken = None, on_progress=None) -> str:
     """
     Agent that uses ReAct pattern to answer questions with multiple tools.
     
@@ -16,12 +16,18 @@ def agent_answer(user_question: str, max_iterations: int = 5) -> str:
         user_question: The user's natural language question
         tools_registry: Dictionary of available tools {name: Tool}
         max_iterations: Maximum number of reasoning loops (safety limit)
+        cancel_token: Cancelling it stops the loop and interrupts any running query
+        on_progress: Called with a running query's completion percentage (-1 if unknown)
         
     Returns:
         Final synthesized answer as a string
     """
-    client = get_openai_client()
+    cancel_token = cancel_token or CancelToken()
+    with query_scope(cancel_token, on_progress):
+        return _agent_loop(user_question, max_iterations, cancel_token)
 
+
+def _agent_loop(user_question: str, max_iterations: int, cancel_token: CancelToken) -> str:
     # Convert tools to OpenAI format
     tools_for_openai = get_tools_for_openai()
 
@@ -34,6 +40,7 @@ def agent_answer(user_question: str, max_iterations: int = 5) -> str:
     You have multiple tools available:
     - text_to_sql: For flexible, ad-hoc queries about any data in the database
     - open_work: For quickly getting outstanding work items (automatically filtered for current user)
+    - search_notes: For finding what was said in interaction notes (e.g. "who mentioned pricing concerns?")
 
     IMPORTANT: For questions asking about multiple things (like "open work AND deals closing soon"):
     1. Call open_work first
@@ -48,15 +55,24 @@ def agent_answer(user_question: str, max_iterations: int = 5) -> str:
         {"role": "user", "content": user_question}  
     ]
 
+    # Failed tool calls so far; lets the router escalate to a stronger model
+    tool_failures = 0
+    last_error = ""
+
     try: 
         for iteration in range(max_iterations):
+            if cancel_token.cancelled:
+                return STOPPED_MESSAGE
             print(f"\n{'='*60}")
             print(f"ITERATION {iteration + 1}")
             print(f"{'='*60}")
             # Ask LLM what to do next
-            response = client.chat.completions.create(
-                model='gpt-4o-mini',
-                messages=messages,
+            response = chat_completion(
+                "agent",
+                messages,
+                question=user_question,
+                failures=tool_failures,
+                last_error=last_error,
                 tools=tools_for_openai,
                 tool_choice='auto'
             )
@@ -81,6 +97,8 @@ def agent_answer(user_question: str, max_iterations: int = 5) -> str:
 
             # Execute each tool the LLM requested
             for tool_call in message.tool_calls:
+                if cancel_token.cancelled:
+                    return STOPPED_MESSAGE
                 tool_name = tool_call.function.name
                 tool_args = json.loads(tool_call.function.arguments)
 
@@ -90,7 +108,12 @@ def agent_answer(user_question: str, max_iterations: int = 5) -> str:
                 if not tool:
                     result = f"Error: Tool '{tool_name}' not found."
                 else:
-                    result = tool.handler(tool_args)
+                    with tagged(tool=tool_name, sales_agent=current_user):
+                        result = tool.handler(tool_args)
+
+                if result.startswith(("Error", "SQL generation failed")):
+                    tool_failures += 1
+                    last_error = result
 
                 print(f"→ RESULT: {len(result)} characters")
                 print(f"  Preview: {result[:150]}...")
@@ -109,6 +132,8 @@ def agent_answer(user_question: str, max_iterations: int = 5) -> str:
         # OUTSIDE the for loop (dedent twice - align with 'for iteration')
         return "I've gathered information but reached my processing limit"
         
+    except QueryCancelled:
+        return STOPPED_MESSAGE
     except Exception as e:
         return f"An error occurred while processing your request: {str(e)}"
     
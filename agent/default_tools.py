@@ -0,0 +1,74 @@
+from .tools import Tool, register_tool
+from .open_work import open_work_handler
+from .text_to_sql import text_to_sql_handler
+from .search import search_notes_handler
+
+
+def register_default_tools():
+    """Register the tools the sales assistant exposes to the LLM"""
+    # Register the text_to_sql tool
+    register_tool(Tool(
+        name="text_to_sql",
+        description="Generate and execute SQL queries from natural language questions about the sales database. Use this for flexible, ad-hoc queries about accounts, deals, interactions, products, and sales teams.",
+        parameters={
+            "type": "object",
+            "properties": {
+                "question": {
+                    "type": "string",
+                    "description": "The natural language question to convert to SQL."
+                }
+            },
+            "required": ["question"]
+        },
+        handler=text_to_sql_handler
+    ))
+
+    # Register the open_work tool
+    register_tool(Tool(
+        name="open_work",
+        description="Get a list of outstanding work items and tasks that need attention. This shows deals in 'Engaging' stage from the last 30 days. Use this for questions about 'what to work on', 'outstanding items', 'tasks today', or 'open work'.",
+        parameters={
+            "type": "object",
+            "properties": {
+                "limit": {
+                    "type": "integer",
+                    "description": "Maximum number of items to return (default: 25)"
+                },
+                "sales_agent": {
+                    "type": "string",
+                    "description": "Optional: filter by sales agent name"
+                }
+            }
+        },
+        handler=open_work_handler
+    ))
+
+    # Register the search_notes tool
+    register_tool(Tool(
+        name="search_notes",
+        description="Search the text of interaction notes (meeting and email comments) and return the best-matching notes ranked by relevance. Use this for questions about what was discussed, e.g. 'which accounts mentioned pricing concerns?', instead of text_to_sql with ILIKE.",
+        parameters={
+            "type": "object",
+            "properties": {
+                "query": {
+                    "type": "string",
+                    "description": "What to look for in the notes, e.g. 'pricing concerns'."
+                },
+                "mode": {
+                    "type": "string",
+                    "enum": ["hybrid", "keyword", "semantic"],
+                    "description": "keyword for exact terms, semantic for meaning, hybrid (default) for both."
+                },
+                "limit": {
+                    "type": "integer",
+                    "description": "Maximum number of notes to return (default: 10)"
+                },
+                "sales_agent": {
+                    "type": "string",
+                    "description": "Optional: only search notes for this sales agent's accounts"
+                }
+            },
+            "required": ["query"]
+        },
+        handler=search_notes_handler
+    ))
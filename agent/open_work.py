@@ -1,18 +1,38 @@
+import pandas as pd
 import streamlit as st
-from database import db_query
+from database import open_work
+
+
+def format_open_work(items: pd.DataFrame) -> pd.Series:
+    """Render open work rows as markdown bullet lines, one per item"""
+    def text(col):
+        return items[col].astype("string").fillna("")
+
+    lines = "- **" + text("account_name").replace("", "Unknown") + "** • " \
+        + text("deal_stage") + " • Product: " + text("product")
+
+    activity = text("activity_type")
+    last = " • Last: " + activity + " (" + text("status_lc") + ") on " + text("last_activity_date")
+    lines = lines.where(activity == "", lines + last)
+
+    comment = text("comment")
+    snippet = comment.where(comment.str.len() <= 80, comment.str[:80] + "...")
+    lines = lines.where(comment.str.strip() == "", lines + "\n  _" + snippet + "_")
+
+    return lines
 
 
 def open_work_handler(args):
     """
     Predefined tool for fetching outstanding work items.
-    Automatically fitlers by current user unless override specified. 
+    Automatically fitlers by current user unless override specified.
 
     Args:
         args: Dictionary with optional 'limit' and 'sales_agent' keys
-        
+
     Returns:
         Formatted string of outstanding work items
-    """ 
+    """
 
     limit = args.get('limit', 25)
     sales_agent = args.get('sales_agent')
@@ -22,56 +42,22 @@ def open_work_handler(args):
         sales_agent = st.session_state.current_user
 
     try:
-        sql = """
-            SELECT 
-                account_id,
-                account AS account_name,
-                deal_stage,
-                sales_agent,
-                product,
-                activity_type,
-                status_lc,
-                d_interaction AS last_activity_date,
-                comment
-            FROM v_open_work
-        """
-        
-        conditions = []
-        if sales_agent:
-            conditions.append(f"LOWER(sales_agent) = LOWER('{sales_agent}')")
-
-            if conditions:
-                sql += " WHERE " + " AND ".join(conditions)
-
-            sql += f" ORDER BY d_interaction DESC NULLS LAST LIMIT {limit}"
-
-            results_df = db_query(sql)
+        work = open_work()
 
+        if sales_agent:
+            results_df = work.for_agent(sales_agent, limit)
             if results_df.empty:
                 return f"No outstanding work items found for sales agent '{sales_agent}'."
-            
-        # Format results
-        lines = [f"**Outstanding Work Items for {sales_agent}** ({len(results_df)} found):"]
-        for _, row in results_df.iterrows():
-            acct = row.get("account_name", "Unknown")
-            stage = row.get("deal_stage", "")
-            prod = row.get("product", "")
-            activity = row.get("activity_type", "")
-            status = row.get("status_lc", "")
-            date = row.get("last_activity_date", "")
-            comment = row.get("comment", "")
-            
-            line = f"- **{acct}** • {stage} • Product: {prod}"
-            if activity:
-                line += f" • Last: {activity} ({status}) on {date}"
-            if isinstance(comment, str) and comment.strip():
-                snippet = (comment[:80] + "...") if len(comment) > 80 else comment
-                line += f"\n  _{snippet}_"
-            
-            lines.append(line)
-        
+            title = f"**Outstanding Work Items for {sales_agent}**"
+        else:
+            results_df = work.frame.sort_values("last_activity_date", ascending=False).head(limit)
+            if results_df.empty:
+                return "No outstanding work items found."
+            title = "**Outstanding Work Items**"
+
+        lines = [f"{title} ({len(results_df)} found):"]
+        lines.extend(format_open_work(results_df))
         return "\n".join(lines)
-        
-    except Exception as e:
-        return f"Error fetching open work: {str(e)}"           
 
+    except Exception as e:
+        return f"Error fetching open work: {str(e)}"
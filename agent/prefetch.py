@@ -0,0 +1,98 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Any, Callable, Dict
+from database import get_schema_info, open_work
+from .snapshot import build_snapshot
+
+# Shared by every session; each session keeps its own bounded cache of futures
+MAX_PREFETCH_WORKERS = 4
+MAX_CACHED_AGENTS = 3
+# Prefetched values older than this are reloaded rather than reused
+PREFETCH_TTL_SECONDS = 300
+
+_EXECUTOR = ThreadPoolExecutor(max_workers=MAX_PREFETCH_WORKERS, thread_name_prefix="prefetch")
+
+# Prefetches are speculative, so they yield to queries someone is waiting on;
+# get() computes misses inline under the loaders' default (interactive) workload
+PREFETCH_WORKLOAD = "batch"
+
+# Values kept per session and read back through get(): kind -> loader(sales_agent, workload=...)
+PREFETCH_TASKS: Dict[str, Callable[[str], Any]] = {
+    "snapshot": build_snapshot,
+}
+
+# Loads that only fill process-wide caches (open_work per date and data
+# version, get_schema_info per data version), so nothing is kept per session
+WARM_TASKS: Dict[str, Callable[[], Any]] = {
+    "open_work": open_work,
+    "schema": get_schema_info,
+}
+
+
+class Prefetcher:
+    """
+    Per-session cache of background loads for recently selected agents.
+
+    warm() submits every PREFETCH_TASKS loader for an agent in parallel, and
+    starts WARM_TASKS for the shared caches; get() returns the prefetched value
+    (waiting if it is already running) or computes it inline on a miss or when
+    the load is still queued. Values expire after PREFETCH_TTL_SECONDS. Only
+    the most recent MAX_CACHED_AGENTS agents are kept; evicted agents have
+    their not-yet-started loads cancelled.
+    Loaders run off the Streamlit script thread, so they must not touch
+    st.session_state.
+    """
+
+    def __init__(self, max_agents: int = MAX_CACHED_AGENTS):
+        self.max_agents = max_agents
+        # agent -> kind -> (future, submitted at)
+        self._entries: "OrderedDict[str, Dict[str, tuple[Future, float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def warm(self, sales_agent: str):
+        """Start loading everything for sales_agent that is not already cached"""
+        with self._lock:
+            entry = self._entries.setdefault(sales_agent, {})
+            self._entries.move_to_end(sales_agent)
+            for kind, loader in PREFETCH_TASKS.items():
+                if not self._usable(entry.get(kind)):
+                    entry[kind] = (_EXECUTOR.submit(loader, sales_agent, workload=PREFETCH_WORKLOAD),
+                                   time.monotonic())
+            while len(self._entries) > self.max_agents:
+                _, evicted = self._entries.popitem(last=False)
+                for future, _ in evicted.values():
+                    future.cancel()
+        for loader in WARM_TASKS.values():
+            _EXECUTOR.submit(loader)
+
+    @staticmethod
+    def _usable(cached) -> bool:
+        if cached is None:
+            return False
+        future, submitted = cached
+        if future.cancelled() or (future.done() and future.exception()):
+            return False
+        return time.monotonic() - submitted < PREFETCH_TTL_SECONDS
+
+    def get(self, kind: str, sales_agent: str) -> Any:
+        """Prefetched value for (kind, agent), computed inline on a miss or failure"""
+        with self._lock:
+            cached = self._entries.get(sales_agent, {}).get(kind)
+        # A load still queued behind other sessions' work is cancelled and run
+        # inline instead, which is faster than waiting for a worker
+        if self._usable(cached) and not cached[0].cancel():
+            try:
+                return cached[0].result()
+            except Exception:
+                pass  # failed: recompute inline so errors surface here
+        return PREFETCH_TASKS[kind](sales_agent)
+
+    def cancel(self, sales_agent: str = None):
+        """Cancel pending loads and drop cached values for one agent, or all"""
+        with self._lock:
+            agents = [sales_agent] if sales_agent else list(self._entries)
+            for agent in agents:
+                for future, _ in self._entries.pop(agent, {}).values():
+                    future.cancel()
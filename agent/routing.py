@@ -0,0 +1,193 @@
+import json
+import os
+import re
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, asdict
+from typing import Optional
+import pandas as pd
+from openai import OpenAI
+
+
+@dataclass(frozen=True)
+class ModelRoute:
+    """Where and how to send one LLM call"""
+    tier: str
+    model: str
+    base_url: Optional[str] = None  # None uses the default OpenAI endpoint
+
+
+@dataclass
+class RoutingRecord:
+    """One routed call, kept so the policy can be tuned for speed and quality"""
+    call_type: str
+    tier: str
+    model: str
+    reason: str
+    latency_s: float
+    ok: bool          # the API call succeeded
+    timestamp: float
+    response_id: Optional[str] = None
+    valid: Optional[bool] = None  # the output passed the caller's checks; None if not checked
+
+
+# Tiers from cheapest/fastest to strongest. The local tier is any
+# OpenAI-compatible server (vLLM, Ollama, llama.cpp...) and is only used when
+# LLM_LOCAL_BASE_URL is set.
+TIERS = {
+    "local": ModelRoute("local", os.getenv("LLM_LOCAL_MODEL", "llama3.1:8b"), os.getenv("LLM_LOCAL_BASE_URL")),
+    "fast": ModelRoute("fast", os.getenv("LLM_FAST_MODEL", "gpt-4o-mini")),
+    "strong": ModelRoute("strong", os.getenv("LLM_STRONG_MODEL", "gpt-4o")),
+}
+TIER_ORDER = ["local", "fast", "strong"]
+
+# Per call type: starting tier for simple / complex questions and request parameters
+CALL_POLICIES = {
+    "agent":       {"simple": "fast",  "complex": "fast", "max_tokens": 1024, "temperature": None},
+    "sql":         {"simple": "local", "complex": "fast", "max_tokens": 512,  "temperature": 0.0},
+    "suggestions": {"simple": "fast",  "complex": "fast", "max_tokens": 700,  "temperature": 0.7},
+    # Restructuring an invalid suggestions reply; no reasoning needed
+    "suggestions_repair": {"simple": "local", "complex": "local", "max_tokens": 700, "temperature": 0.0},
+}
+
+# Errors that only need a name fixed; retrying them does not justify a stronger model
+_NAME_ERROR = re.compile(r"Binder Error|not found in FROM clause|does not exist|Unknown table", re.I)
+# Signals that a question needs multi-step reasoning (joins, comparisons, time series)
+_COMPLEX_HINTS = re.compile(
+    r"\b(compare|versus|vs\.?|trend|over time|per|each|by (month|quarter|week|sector|region|product)|"
+    r"rank|top \d+|growth|ratio|rate|and then|excluding|without|correlat\w*)\b",
+    re.I,
+)
+
+ROUTING_LOG = deque(maxlen=2000)
+ROUTING_LOG_PATH = os.getenv("LLM_ROUTING_LOG")  # optional JSONL file of every decision
+_log_lock = threading.Lock()
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def question_complexity(question: str) -> str:
+    """Classify a question as 'simple' or 'complex' from cheap lexical signals"""
+    if not question:
+        return "simple"
+    if len(question) > 160 or question.count("?") > 1 or len(_COMPLEX_HINTS.findall(question)) >= 2:
+        return "complex"
+    return "simple"
+
+
+def _available(tier: str) -> bool:
+    return tier != "local" or bool(TIERS["local"].base_url)
+
+
+def choose_route(call_type: str, question: str = "", failures: int = 0, last_error: str = "") -> tuple[ModelRoute, str]:
+    """
+    Pick the model for a call.
+    Starts at the tier the policy gives for the question's complexity and
+    moves up one tier per earlier failure, except failures that only need a
+    column/table name fixed.
+    Returns: (route, reason)
+    """
+    policy = CALL_POLICIES[call_type]
+    complexity = question_complexity(question)
+    tier = policy[complexity]
+    reason = complexity
+
+    escalations = failures
+    if failures and last_error and _NAME_ERROR.search(last_error):
+        escalations -= 1
+        reason += ", name-fix retry"
+    if escalations > 0:
+        reason += f", escalated after {failures} failure(s)"
+
+    # Escalate from the first tier that is actually configured
+    tiers = [t for t in TIER_ORDER[TIER_ORDER.index(tier):] if _available(t)]
+    return TIERS[tiers[min(max(0, escalations), len(tiers) - 1)]], reason
+
+
+def get_client(base_url: Optional[str] = None) -> OpenAI:
+    """Shared OpenAI client per endpoint, so connections are reused across calls"""
+    with _clients_lock:
+        if base_url not in _clients:
+            _clients[base_url] = OpenAI(base_url=base_url, api_key=os.getenv("LLM_LOCAL_API_KEY", "local")) \
+                if base_url else OpenAI()
+        return _clients[base_url]
+
+
+def _record(entry: RoutingRecord):
+    ROUTING_LOG.append(entry)
+    if ROUTING_LOG_PATH:
+        with _log_lock, open(ROUTING_LOG_PATH, "a") as f:
+            f.write(json.dumps(asdict(entry)) + "\n")
+
+
+def chat_completion(call_type: str, messages: list, question: str = "",
+                    failures: int = 0, last_error: str = "", **kwargs):
+    """
+    Route and send a chat completion.
+
+    Args:
+        call_type: Key of CALL_POLICIES ("agent", "sql", "suggestions", "suggestions_repair")
+        messages: Chat messages
+        question: The user's question, used to judge complexity
+        failures: How many earlier attempts at this step failed validation or execution
+        last_error: The most recent failure message
+        **kwargs: Passed through to the API (tools, tool_choice, ...)
+
+    Returns:
+        The OpenAI chat completion response
+    """
+    route, reason = choose_route(call_type, question, failures, last_error)
+    policy = CALL_POLICIES[call_type]
+    params = {k: policy[k] for k in ("max_tokens", "temperature") if policy[k] is not None}
+    params.update(kwargs)
+
+    start = time.perf_counter()
+    response = None
+    try:
+        response = get_client(route.base_url).chat.completions.create(
+            model=route.model, messages=messages, **params
+        )
+        return response
+    finally:
+        _record(RoutingRecord(call_type, route.tier, route.model, reason,
+                              time.perf_counter() - start, response is not None, time.time(),
+                              getattr(response, "id", None)))
+
+
+def report_validation(response, valid: bool):
+    """
+    Record whether a routed call's output passed the caller's checks (SQL
+    validation and execution, schema validation...), so routing_summary can
+    show which tier produces unusable output. The JSONL log gets the record
+    again with `valid` set; the last line per response_id wins.
+    """
+    response_id = getattr(response, "id", None)
+    if response_id is None:
+        return
+    with _log_lock:
+        entry = next((r for r in reversed(ROUTING_LOG) if r.response_id == response_id), None)
+        if entry is None:
+            return
+        entry.valid = valid
+    if ROUTING_LOG_PATH:
+        with _log_lock, open(ROUTING_LOG_PATH, "a") as f:
+            f.write(json.dumps(asdict(entry)) + "\n")
+
+
+def routing_summary() -> pd.DataFrame:
+    """
+    Calls, API failure rate, invalid-output rate (over the calls whose output
+    was checked) and latency percentiles per call type and model
+    """
+    if not ROUTING_LOG:
+        return pd.DataFrame()
+    log = pd.DataFrame([asdict(r) for r in ROUTING_LOG])
+    return log.groupby(["call_type", "tier", "model"]).agg(
+        calls=("ok", "size"),
+        failure_rate=("ok", lambda s: 1 - s.mean()),
+        validated=("valid", "count"),
+        invalid_rate=("valid", lambda s: (s == False).sum() / s.count() if s.count() else None),  # noqa: E712
+        p50_s=("latency_s", "median"),
+        p95_s=("latency_s", lambda s: s.quantile(0.95)),
+    ).reset_index()
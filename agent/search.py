@@ -0,0 +1,51 @@
+from typing import Dict, Any
+from database import keyword_search, semantic_search, hybrid_search
+from database.search import semantic_index_available
+
+SEARCH_MODES = {
+    "keyword": keyword_search,
+    "semantic": semantic_search,
+    "hybrid": hybrid_search,
+}
+
+
+def search_notes_handler(args: Dict[str, Any]) -> str:
+    """
+    Tool handler for ranked search over interaction notes (interactions.comment).
+    Keyword mode uses the BM25 index; semantic and hybrid modes also use the
+    comment embeddings and fall back to keyword search when that index is missing.
+    """
+    query = args.get("query", "")
+    mode = args.get("mode", "hybrid")
+    limit = args.get("limit", 10)
+    sales_agent = args.get("sales_agent")
+
+    if not query:
+        return "Error: No search query provided."
+    if mode not in SEARCH_MODES:
+        return f"Error: Unknown search mode '{mode}'. Use one of: {', '.join(SEARCH_MODES)}."
+    if mode != "keyword" and not semantic_index_available():
+        mode = "keyword"
+
+    try:
+        hits = SEARCH_MODES[mode](query, limit, sales_agent)
+
+        if hits.empty:
+            return f"No interaction notes matched '{query}'."
+
+        comment = hits["comment"].astype("string").fillna("").str.replace(r"\s+", " ", regex=True)
+        snippet = comment.where(comment.str.len() <= 200, comment.str[:200] + "...")
+        lines = (
+            "- **" + hits["account_name"].astype("string").fillna("Unknown") + "** • "
+            + hits["activity_type"].astype("string").fillna("") + " with "
+            + hits["contact_name"].astype("string").fillna("unknown contact") + " on "
+            + hits["interaction_date"].astype("string").fillna("")
+            + " (score " + hits["score"].round(3).astype("string") + ")"
+            + "\n  _" + snippet + "_"
+        )
+
+        header = f"**Interaction notes matching '{query}'** ({len(hits)} found, {mode} search):"
+        return "\n".join([header, *lines])
+
+    except Exception as e:
+        return f"Error searching interaction notes: {str(e)}"
@@ -0,0 +1,160 @@
+import json
+from datetime import date
+import pandas as pd
+from database import db_query, last_touch, open_work, tagged
+
+# Rough prompt budget for the snapshot; ~4 characters per token for JSON text
+SNAPSHOT_TOKEN_BUDGET = 1500
+CHARS_PER_TOKEN = 4
+DEFAULT_TOP_N = 8
+CLOSING_SOON_DAYS = 14
+RECENT_INTERACTION_DAYS = 14
+COMMENT_CHARS = 120
+# Used when an agent has no closed deals to learn a sales cycle from
+DEFAULT_CYCLE_DAYS = 60
+# Workload for snapshots built while a page waits on them; prefetches pass
+# "batch" so they yield to chat queries
+WORKLOAD = "interactive"
+
+
+def _table(df: pd.DataFrame) -> dict:
+    """Compact column/row encoding: column names are written once, not per row"""
+    df = df.copy()
+    for col in df.select_dtypes(include="datetime").columns:
+        df[col] = df[col].dt.strftime("%Y-%m-%d")
+    return {
+        "columns": list(df.columns),
+        "rows": df.astype(object).where(df.notna(), None).values.tolist(),
+    }
+
+
+def _load(sales_agent: str, as_of: date, workload: str) -> dict:
+    """Everything the snapshot can draw from, already ranked; trimmed later"""
+    agent_filter = "agent_key = LOWER(TRIM($agent))"
+
+    stages = db_query(f"""
+        SELECT deal_stage,
+               CAST(SUM(deal_count) AS BIGINT)        AS deals,
+               CAST(SUM(total_close_value) AS BIGINT) AS value
+        FROM rollup_pipeline_monthly
+        WHERE {agent_filter}
+        GROUP BY deal_stage
+        ORDER BY deal_stage
+    """, {"agent": sales_agent}, workload=workload)
+
+    # Open deals have no close_date, so expected close is engage_date plus the
+    # agent's median sales cycle on deals that did close
+    closing = db_query(f"""
+        WITH deals AS (
+            SELECT * FROM sales_pipeline WHERE {agent_filter}
+        ),
+        cycle AS (
+            SELECT COALESCE(MEDIAN(close_date - engage_date), {DEFAULT_CYCLE_DAYS}) AS days
+            FROM deals
+            WHERE close_date IS NOT NULL AND engage_date IS NOT NULL
+        )
+        SELECT a.account,
+               CAST(deals.product AS VARCHAR) AS product,
+               deals.engage_date,
+               CAST(deals.engage_date + CAST(cycle.days AS INTEGER) AS DATE) AS expected_close,
+               CAST(deals.engage_date + CAST(cycle.days AS INTEGER) - $as_of AS INTEGER) AS days_to_close
+        FROM deals
+        CROSS JOIN cycle
+        JOIN accounts a ON a.account_id = deals.account_id
+        WHERE deals.deal_stage = 'Engaging'
+          AND deals.account_id IS NOT NULL
+          AND deals.engage_date + CAST(cycle.days AS INTEGER) <= $as_of + {CLOSING_SOON_DAYS}
+    """, {"as_of": as_of, "agent": sales_agent}, workload=workload)
+    # Upcoming deals soonest first; overdue ones most recently due first, so
+    # long-stale deals cannot crowd out the ones that still need action
+    upcoming = closing[closing["days_to_close"] >= 0].sort_values("days_to_close")
+    overdue = (
+        closing[closing["days_to_close"] < 0]
+        .sort_values("days_to_close", ascending=False)
+        .assign(days_overdue=lambda df: -df["days_to_close"])
+    )
+
+    accounts = db_query(f"""
+        SELECT a.account_id, a.account, a.sector,
+               COUNT(*) FILTER (WHERE sp.deal_stage IN ('Prospecting', 'Engaging')) AS open_deals
+        FROM accounts a
+        JOIN sales_pipeline sp ON a.account_id = sp.account_id
+        WHERE sp.{agent_filter}
+        GROUP BY ALL
+    """, {"agent": sales_agent}, workload=workload)
+    stale = (
+        accounts
+        .merge(last_touch(as_of).frame[["account_id", "days_since_touch"]], on="account_id", how="left")
+        .sort_values("days_since_touch", ascending=False, na_position="first")
+        .drop(columns="account_id")
+    )
+
+    recent = db_query(f"""
+        SELECT DISTINCT a.account, i.activity_type, LOWER(i.status) AS status,
+               CAST(i.timestamp AS DATE) AS date,
+               LEFT(REGEXP_REPLACE(COALESCE(i.comment, ''), '\\s+', ' ', 'g'), {COMMENT_CHARS}) AS note
+        FROM interactions i
+        JOIN accounts a ON i.account_id = a.account_id
+        JOIN sales_pipeline sp ON a.account_id = sp.account_id
+        WHERE sp.{agent_filter}
+          AND CAST(i.timestamp AS DATE) BETWEEN $as_of - {RECENT_INTERACTION_DAYS} AND $as_of
+        ORDER BY date DESC
+    """, {"as_of": as_of, "agent": sales_agent}, workload=workload)
+
+    work = open_work(as_of).for_agent(sales_agent)[
+        ["account_name", "product", "activity_type", "status_lc", "last_activity_date"]
+    ].rename(columns={"account_name": "account", "status_lc": "status", "last_activity_date": "last_activity"})
+
+    return {
+        "stages": stages,
+        "upcoming": upcoming.drop(columns="days_to_close"),
+        "overdue": overdue.drop(columns="days_to_close"),
+        "stale": stale,
+        "recent": recent,
+        "work": work,
+        "totals": {
+            "deals": int(stages["deals"].sum()) if not stages.empty else 0,
+            "accounts": len(accounts),
+            "open_work_items": len(work),
+            "deals_closing_soon": len(upcoming),
+            "deals_overdue": len(overdue),
+        },
+    }
+
+
+def _encode(sales_agent: str, as_of: date, data: dict, top_n: int) -> str:
+    snapshot = {
+        "agent": sales_agent,
+        "as_of": as_of,
+        "totals": data["totals"],
+        "pipeline_by_stage": _table(data["stages"]),
+        f"expected_to_close_within_{CLOSING_SOON_DAYS}_days": _table(data["upcoming"].head(top_n)),
+        "overdue_expected_close": _table(data["overdue"].head(top_n)),
+        "stalest_accounts": _table(data["stale"].head(top_n)),
+        "open_work": _table(data["work"].head(top_n)),
+        f"interactions_last_{RECENT_INTERACTION_DAYS}_days": _table(data["recent"].head(top_n)),
+    }
+    return json.dumps(snapshot, separators=(",", ":"), default=str)
+
+
+def build_snapshot(sales_agent: str, token_budget: int = SNAPSHOT_TOKEN_BUDGET,
+                   top_n: int = DEFAULT_TOP_N, as_of: date = None, workload: str = WORKLOAD) -> str:
+    """
+    Compact JSON summary of an agent's book for the suggestions prompt.
+
+    Contains per-stage counts and values, the deals expected to close soon
+    and those already overdue, the accounts that have gone longest without a
+    touch, open work and recent interactions. Lists are ranked and cut to
+    top_n items, which is halved until the text fits token_budget, so prompt
+    size stays flat no matter how many deals and accounts the agent has.
+    Queries run under `workload`; background builds should pass "batch".
+    """
+    as_of = as_of or date.today()
+    with tagged(tool="snapshot", sales_agent=sales_agent):
+        data = _load(sales_agent, as_of, workload)
+
+    text = _encode(sales_agent, as_of, data, top_n)
+    while len(text) > token_budget * CHARS_PER_TOKEN and top_n > 1:
+        top_n //= 2
+        text = _encode(sales_agent, as_of, data, top_n)
+    return text
@@ -1,41 +1,65 @@
 import json
-from database import db_query, get_schema_info, get_business_context
+from database import (
+    db_query, get_schema_info, get_business_context, get_relation_names,
+    guard_sql, parse_sql, referenced_relations, QUERY_TIMEOUT_SECONDS, RESULT_ROW_LIMIT, run_and_store,
+    QueryCancelled, tagged, learned_examples
+)
 from typing import Dict, Any
+from .routing import chat_completion, report_validation
+
+# Table functions that only generate values; anything else (read_csv,
+# read_parquet, glob...) could reach outside the database.
+ALLOWED_TABLE_FUNCTIONS = {"range", "generate_series", "unnest"}
+# Rows of a result written into the tool output; the full result is kept
+# server-side for the UI to page through and export
+PREVIEW_ROWS = 20
 
-def get_openai_client():
-    """Initialize and return an OpenAI client"""
-    from openai import OpenAI
-    return OpenAI()
 
 def validate_sql(sql: str) -> tuple[bool, str]:
     """
-    Basic validation to ensure SQL is safe to execute.
+    Validate SQL against DuckDB's own parse tree before executing it.
+    Only a single SELECT statement reading from known tables/views is allowed.
     Returns (is_valid, error_message)
     """
-    sql_upper = sql.upper().strip()
-    
-    # Check 1: Must start with SELECT
-    if not sql_upper.startswith("SELECT"):
-        return False, "Only SELECT queries are allowed"
-    
-    # Check 2: No dangerous keywords
-    dangerous_keywords = ["DROP", "DELETE", "INSERT", "UPDATE", "ALTER", "CREATE", "TRUNCATE"]
-    for keyword in dangerous_keywords:
-        if keyword in sql_upper:
-            return False, f"Dangerous keyword detected: {keyword}"
+    tree = parse_sql(sql)
+
+    # Check 1: Must parse, and must be a SELECT
+    if tree.get("error"):
+        if tree.get("error_type") == "not implemented":
+            return False, "Only SELECT queries are allowed"
+        return False, f"SQL parse error: {tree.get('error_message', 'unknown error')}"
+
+    # Check 2: Exactly one statement
+    statements = tree.get("statements", [])
+    if len(statements) != 1:
+        return False, f"Expected exactly one SELECT statement, got {len(statements)}"
+
+    # Check 3: Only read from known tables/views (or the query's own CTEs)
+    tables, functions, ctes = referenced_relations(statements[0])
+    known = get_relation_names()
+    for schema_name, table_name in sorted(tables):
+        if schema_name not in ("", "main") or (table_name not in known and table_name not in ctes):
+            qualified = f"{schema_name}.{table_name}" if schema_name else table_name
+            return False, f"Unknown table or view: {qualified}"
+
+    disallowed = sorted(functions - ALLOWED_TABLE_FUNCTIONS)
+    if disallowed:
+        return False, f"Table function not allowed: {disallowed[0]}"
     
     return True, ""
 
 
-def generate_sql_with_retry(user_question: str, max_attempts: int = 2) -> tuple[str, str]:
+def generate_sql_with_retry(user_question: str, max_attempts: int = 2) -> tuple[str, str, bool]:
     """
     Generate SQL with error recovery.
-    Returns: (sql, error_message)
-    If successful, error_message is empty string.
+    Returns: (sql, error_message, truncated)
+    If successful, error_message is empty string. truncated is True when the
+    guard capped the result at RESULT_ROW_LIMIT rows.
     """
-    client = get_openai_client()
     schema = get_schema_info()
     context = get_business_context()
+    # Questions that were answered well before, taken from the query history
+    learned = learned_examples()
     
     last_error = ""
     last_sql = ""
@@ -49,6 +73,8 @@ def generate_sql_with_retry(user_question: str, max_attempts: int = 2) -> tuple[
 
 {context}
 
+{learned}
+
 User question: {user_question}
 
 Generate ONLY the SQL query, no explanation. Use read-only SELECT statements only.
@@ -74,9 +100,13 @@ Please fix the query. Pay careful attention to:
 3. Generate ONLY the corrected SQL query, no explanation.
 """
         
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": prompt}]
+        # Each failed attempt lets the router move to a stronger model
+        response = chat_completion(
+            "sql",
+            [{"role": "user", "content": prompt}],
+            question=user_question,
+            failures=attempt,
+            last_error=last_error
         )
         
         sql = response.choices[0].message.content.strip()
@@ -91,21 +121,35 @@ Please fix the query. Pay careful attention to:
         # Validate
         is_valid, error_msg = validate_sql(sql)
         if not is_valid:
+            report_validation(response, False)
+            last_error = error_msg
+            last_sql = sql
+            continue
+        
+        # Check the plan's estimated cost before running anything
+        sql, error_msg, truncated = guard_sql(sql)
+        if error_msg:
+            report_validation(response, False)
             last_error = error_msg
             last_sql = sql
             continue
         
         # Try to execute
         try:
-            db_query(sql)  # Test execution
-            return sql, ""  # Success!
+            with tagged(question=user_question, attempt=attempt + 1):
+                db_query(sql, timeout=QUERY_TIMEOUT_SECONDS)  # Test execution
+            report_validation(response, True)
+            return sql, "", truncated  # Success!
+        except QueryCancelled:
+            raise
         except Exception as e:
+            report_validation(response, False)
             last_error = str(e)
             last_sql = sql
             # Continue to next attempt
     
     # All attempts failed
-    return last_sql, last_error
+    return last_sql, last_error, False
 
 
 
@@ -121,20 +165,30 @@ def text_to_sql_handler(args: Dict[str, Any]) -> str:
         return "Error: No question provided."
     
     # Generate SQL with retry logic
-    sql, error = generate_sql_with_retry(question, max_attempts=2)
+    sql, error, truncated = generate_sql_with_retry(question, max_attempts=2)
 
     if error:
         return f"SQL generation failed: {error}\n\nLast attempted SQL:\n```sql\n{sql}\n```"
     
     # Execute the validated SQL
     try:
-        results_df = db_query(sql)
+        with tagged(question=question):
+            result = run_and_store(sql, timeout=QUERY_TIMEOUT_SECONDS, capped=truncated)
         
-        if results_df.empty:
+        if result.num_rows == 0:
             return f"No results found.\n\nSQL used:\n```sql\n{sql}\n```"
         
-        # Show SQL query + results
-        return f"**SQL Query:**\n```sql\n{sql}\n```\n\nFound {len(results_df)} results:\n\n```\n{results_df.to_string(index=False)}\n```"
+        # Show SQL query + a preview; the app renders the full result as a paged table
+        preview = result.table.slice(0, PREVIEW_ROWS).to_pandas()
+        shown = "" if result.num_rows <= PREVIEW_ROWS else f" (first {PREVIEW_ROWS} shown; the full result is in the table below the answer)"
+        # The guard capped the rows; say so rather than presenting the cap as the total
+        note = "" if not result.truncated else (
+            f"\n\nNote: the result was truncated at the {RESULT_ROW_LIMIT:,}-row limit, so the query "
+            f"matches more rows than shown here. An export from the table below has every row."
+        )
+        return f"**SQL Query:**\n```sql\n{sql}\n```\n\nFound {result.num_rows} results{shown}:\n\n```\n{preview.to_string(index=False)}\n```{note}"
     
+    except QueryCancelled:
+        raise
     except Exception as e:
-        return f"Error executing query: {str(e)}\n\nSQL:\n```sql\n{sql}\n```"
\ No newline at end of file
+        return f"Error executing query: {str(e)}\n\nSQL:\n```sql\n{sql}\n```"
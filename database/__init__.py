@@ -1,4 +1,20 @@
-from .connection import db_query
-from .schema import get_schema_info, get_business_context
+from .connection import db_query, db_query_arrow
+from .governor import WorkloadClass, WORKLOADS, ResourceGovernor, governor
+from .execution import CancelToken, QueryCancelled, query_scope, current_token
+from .schema import get_schema_info, get_business_context, get_relation_names
+from .parser import parse_sql, referenced_relations
+from .analytics import LastTouch, OpenWork, last_touch, open_work, clear_analytics_cache
+from .search import keyword_search, semantic_search, hybrid_search, refresh_search_index
+from .rollups import refresh_rollups
+from .guard import guard_sql, unguard_sql, QUERY_TIMEOUT_SECONDS, RESULT_ROW_LIMIT
+from .history import tagged, fingerprint, learned_examples, report as history_report
+from .results import QueryResult, run_and_store, get_result, take_recent_results, export_query, start_export
 
-__all__ = ['db_query', 'get_schema_info', 'get_business_context']
+__all__ = ['db_query', 'db_query_arrow', 'WorkloadClass', 'WORKLOADS', 'ResourceGovernor', 'governor',
+           'CancelToken', 'QueryCancelled', 'query_scope', 'current_token',
+           'get_schema_info', 'get_business_context', 'get_relation_names',
+           'parse_sql', 'referenced_relations', 'guard_sql', 'unguard_sql', 'QUERY_TIMEOUT_SECONDS', 'RESULT_ROW_LIMIT',
+           'LastTouch', 'OpenWork', 'last_touch', 'open_work', 'clear_analytics_cache',
+           'keyword_search', 'semantic_search', 'hybrid_search', 'refresh_search_index',
+           'refresh_rollups', 'QueryResult', 'run_and_store', 'get_result', 'take_recent_results',
+           'export_query', 'start_export', 'tagged', 'fingerprint', 'learned_examples', 'history_report']
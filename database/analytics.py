@@ -0,0 +1,103 @@
+from dataclasses import dataclass
+from datetime import date
+from functools import lru_cache
+from typing import Optional
+import pandas as pd
+from .connection import db_query, data_version
+
+@dataclass(frozen=True)
+class LastTouch:
+    """
+    Most recent interaction per account as of a given date.
+
+    frame columns:
+        account_id (int64), last_touch (datetime64), days_since_touch (Int64),
+        touch_count (int64)
+    """
+    as_of: date
+    frame: pd.DataFrame
+
+
+@dataclass(frozen=True)
+class OpenWork:
+    """
+    Open work items for every agent as of a given date: one row per
+    (agent, account) with an 'Engaging' deal and its latest interaction.
+
+    frame columns:
+        agent_key, sales_agent, account_id, account_name, deal_stage, product,
+        engage_date, close_date, activity_type, status_lc, ts_interaction,
+        last_activity_date, comment
+    """
+    as_of: date
+    frame: pd.DataFrame
+
+    def for_agent(self, sales_agent: str, limit: Optional[int] = None) -> pd.DataFrame:
+        """Items for one agent, most recent activity first"""
+        items = self.frame[self.frame["agent_key"] == sales_agent.strip().lower()]
+        return items if limit is None else items.head(limit)
+
+
+def _resolve(as_of: Optional[date]) -> date:
+    return as_of or date.today()
+
+
+# Cached per (as_of, data_version): a reload by the loaders changes the
+# version, so the next call recomputes instead of serving stale results.
+@lru_cache(maxsize=8)
+def _last_touch(as_of: date, version: tuple) -> LastTouch:
+    frame = db_query("""
+        SELECT
+            account_id,
+            MAX(ts_interaction) AS last_touch,
+            COUNT(*)            AS touch_count
+        FROM v_interactions_norm
+        WHERE d_interaction <= $as_of
+        GROUP BY account_id
+        ORDER BY account_id
+    """, {"as_of": as_of})
+    frame["days_since_touch"] = (
+        (pd.Timestamp(as_of) - frame["last_touch"]).dt.days.astype("Int64")
+    )
+    return LastTouch(as_of=as_of, frame=frame)
+
+
+@lru_cache(maxsize=8)
+def _open_work(as_of: date, version: tuple) -> OpenWork:
+    # open_work_as_of (sql/views.sql) also defines v_open_work, so the tool
+    # and generated SQL agree on what counts as open work
+    frame = db_query("""
+        SELECT
+            agent_key,
+            CAST(sales_agent AS VARCHAR) AS sales_agent,
+            account_id,
+            account_name_from_pipeline   AS account_name,
+            CAST(deal_stage AS VARCHAR)  AS deal_stage,
+            CAST(product AS VARCHAR)     AS product,
+            engage_date,
+            close_date,
+            activity_type,
+            status_lc,
+            ts_interaction,
+            d_interaction                AS last_activity_date,
+            comment
+        FROM open_work_as_of($as_of)
+        ORDER BY agent_key, d_interaction DESC NULLS LAST
+    """, {"as_of": as_of})
+    return OpenWork(as_of=as_of, frame=frame)
+
+
+def last_touch(as_of: Optional[date] = None) -> LastTouch:
+    """Last touch for every account as of the given date (default: today)"""
+    return _last_touch(_resolve(as_of), data_version())
+
+
+def open_work(as_of: Optional[date] = None) -> OpenWork:
+    """Open work for all agents as of the given date (default: today)"""
+    return _open_work(_resolve(as_of), data_version())
+
+
+def clear_analytics_cache():
+    """Drop all cached results; not needed after a reload, which changes data_version"""
+    _last_touch.cache_clear()
+    _open_work.cache_clear()
@@ -1,17 +1,45 @@
 import os
+import time
 import duckdb
 import pandas as pd
+import pyarrow as pa
+from .governor import governor, duckdb_config
+from .execution import execute
+from . import history
 
 DB_PATH = "db/sales.duckdb"
 _VIEWS_SQL = os.path.join(os.path.dirname(__file__), "..", "sql", "views.sql")
 
+# DuckDB refuses to open the same file twice in one process with different
+# settings, so every connection shares this config (see governor.py).
+_CONFIG = duckdb_config()
+
+
+def connect(read_only: bool = True) -> duckdb.DuckDBPyConnection:
+    """Open a connection to the sales database with the shared settings."""
+    return duckdb.connect(DB_PATH, read_only=read_only, config=_CONFIG)
+
+
+def data_version() -> tuple:
+    """
+    Changes whenever the database file is written (by the loaders or any
+    other process), so caches of query results can be keyed on it.
+    """
+    return tuple(
+        os.stat(path).st_mtime_ns if os.path.exists(path) else 0
+        for path in (DB_PATH, DB_PATH + ".wal")
+    )
+
 
 def _ensure_views():
     """Recreate views from sql/views.sql so the DB never drifts from code."""
     if not os.path.exists(_VIEWS_SQL):
         return
-    con = duckdb.connect(DB_PATH, read_only=False)
+    con = connect(read_only=False)
     try:
+        # Nothing to build views on until a loader has created the tables
+        if not con.execute("SELECT 1 FROM duckdb_tables() WHERE table_name = 'sales_pipeline'").fetchall():
+            return
         with open(_VIEWS_SQL) as f:
             con.execute(f.read())
     finally:
@@ -21,24 +49,52 @@ def _ensure_views():
 _ensure_views()
 
 
-def db_query(sql: str, params=None) -> pd.DataFrame:
+def _run(sql: str, params, timeout: float, workload: str, fetch):
+    """
+    Execute on a fresh read-only connection once the governor admits the
+    query. The query runs on a worker thread and is interrupted after
+    `timeout` seconds or when the enclosing query_scope is cancelled. Queue
+    time does not count against the timeout. Every run is recorded in the
+    query history.
+    """
+    with governor.slot(workload):
+        con = connect(read_only=True)
+        start = time.perf_counter()
+        try:
+            result = execute(con, sql, params, fetch, timeout)
+        except Exception as e:
+            history.record(sql, time.perf_counter() - start, error=str(e) or type(e).__name__)
+            raise
+        finally:
+            con.close()
+    history.record(sql, time.perf_counter() - start, rows=len(result))
+    return result
+
+
+def db_query(sql: str, params=None, timeout: float = None, workload: str = "interactive") -> pd.DataFrame:
     """
     Execute a SQL query against the DuckDB database.
     
     Args:
         sql: The SQL query string to execute
         params: Optional dictionary of parameters for parameterized queries
+        timeout: Optional limit in seconds; the query is interrupted and a
+            TimeoutError raised once it is exceeded (QueryCancelled is
+            raised instead if the enclosing query_scope is cancelled)
+        workload: Workload class the query is scheduled under
+            ("interactive", "batch" or "ingest")
         
     Returns:
         pandas DataFrame with query results
     """
-    con = duckdb.connect(DB_PATH, read_only=True)
-    try:
-        return con.execute(sql, params or {}).fetchdf()
-    finally:
-        con.close()
+    return _run(sql, params, timeout, workload, lambda result: result.fetchdf())
+
+
+def db_query_arrow(sql: str, params=None, timeout: float = None, workload: str = "interactive") -> pa.Table:
+    """Same as db_query, but returns a pyarrow Table without going through pandas"""
+    return _run(sql, params, timeout, workload, lambda result: result.to_arrow_table())
 
 if __name__ == "__main__":
     # Test the function
     result = db_query("SELECT * FROM accounts LIMIT 5")
-    print(result)
\ No newline at end of file
+    print(result)
@@ -0,0 +1,111 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Optional
+import duckdb
+from .governor import MAX_ACTIVE_QUERIES
+
+# How often a waiting caller checks its deadline and cancel token and reports progress
+POLL_INTERVAL_SECONDS = 0.25
+
+# The governor already caps concurrent queries, so the pool never queues
+_QUERY_EXECUTOR = ThreadPoolExecutor(max_workers=MAX_ACTIVE_QUERIES, thread_name_prefix="duckdb-query")
+
+
+class QueryCancelled(Exception):
+    """Raised when a running query is stopped through its CancelToken"""
+
+
+class CancelToken:
+    """
+    Cancellation flag shared by everything done for one request.
+    cancel() can be called from any thread; queries running under the token
+    are interrupted within POLL_INTERVAL_SECONDS.
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self.reason = ""
+
+    def cancel(self, reason: str = "cancelled"):
+        self.reason = reason
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def check(self):
+        """Raise QueryCancelled if the token has been cancelled"""
+        if self.cancelled:
+            raise QueryCancelled(f"Query {self.reason}")
+
+
+# Token and progress callback for queries run by the current request
+_scope: ContextVar[tuple] = ContextVar("query_scope", default=(None, None))
+
+
+@contextmanager
+def query_scope(token: CancelToken = None, on_progress: Callable[[float], None] = None):
+    """
+    Run every query issued inside the block under `token`, reporting each
+    query's completion percentage (0-100) to `on_progress` while it runs.
+    """
+    reset = _scope.set((token, on_progress))
+    try:
+        yield token
+    finally:
+        _scope.reset(reset)
+
+
+def current_token() -> Optional[CancelToken]:
+    """The CancelToken of the enclosing query_scope, if any"""
+    return _scope.get()[0]
+
+
+def execute(con: duckdb.DuckDBPyConnection, sql: str, params, fetch, timeout: float = None):
+    """
+    Run `fetch(con.execute(sql, params))` on a worker thread while the caller
+    watches it. The query is interrupted when the timeout passes, when the
+    scope's token is cancelled, or when the caller is itself stopped by an
+    exception (e.g. one raised from the progress callback), so abandoned
+    queries stop using CPU straight away.
+    """
+    token, on_progress = _scope.get()
+    if token:
+        token.check()
+    if on_progress:
+        con.execute("SET enable_progress_bar = true; SET enable_progress_bar_print = false; SET progress_bar_time = 0")
+
+    deadline = time.monotonic() + timeout if timeout else None
+    future = _QUERY_EXECUTOR.submit(lambda: fetch(con.execute(sql, params or {})))
+    stopped_by = None
+    try:
+        while True:
+            try:
+                return future.result(timeout=POLL_INTERVAL_SECONDS)
+            except FutureTimeout:
+                pass
+            if token and token.cancelled:
+                stopped_by = "cancel"
+            elif deadline and time.monotonic() >= deadline:
+                stopped_by = "timeout"
+            if stopped_by:
+                con.interrupt()
+                return future.result()
+            if on_progress:
+                on_progress(con.query_progress())
+    except duckdb.InterruptException:
+        if stopped_by == "timeout":
+            raise TimeoutError(f"Query exceeded the {timeout}s time limit and was cancelled")
+        raise QueryCancelled(f"Query {token.reason if token else 'cancelled'}")
+    finally:
+        if not future.done():
+            # The caller went away mid-query; don't leave the scan running
+            con.interrupt()
+            try:
+                future.result()
+            except Exception:
+                pass
@@ -0,0 +1,109 @@
+import heapq
+import itertools
+import os
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class WorkloadClass:
+    """Resources and scheduling rules for one kind of database work"""
+    name: str
+    priority: int        # lower runs first when queries are queued
+    threads: int
+    memory_limit: str
+    temp_directory: str  # where DuckDB spills operators that exceed memory_limit
+    slots: int           # queries of this class that may run at once in a process
+
+
+WORKLOADS = {
+    "interactive": WorkloadClass("interactive", 0, threads=4, memory_limit="2GB",
+                                 temp_directory="db/tmp/interactive", slots=6),
+    "batch": WorkloadClass("batch", 1, threads=2, memory_limit="1GB",
+                           temp_directory="db/tmp/batch", slots=2),
+    "ingest": WorkloadClass("ingest", 2, threads=4, memory_limit="4GB",
+                            temp_directory="db/tmp/ingest", slots=1),
+}
+
+# Queries running at once in a process across all classes. Batch and ingest
+# slots are well below this, so chat always finds free capacity.
+MAX_ACTIVE_QUERIES = 8
+
+# threads, memory_limit and temp_directory are instance-wide in DuckDB and
+# every connection in a process must share them, so a process runs with the
+# settings of its main workload: the app is interactive, loaders set ingest.
+PROCESS_WORKLOAD = os.getenv("DUCKDB_WORKLOAD", "interactive")
+
+
+def duckdb_config(workload: str = None) -> dict:
+    """DuckDB connection config for a workload class (default: this process's)"""
+    wc = WORKLOADS[workload or PROCESS_WORKLOAD]
+    os.makedirs(wc.temp_directory, exist_ok=True)
+    return {
+        "threads": wc.threads,
+        "memory_limit": wc.memory_limit,
+        "temp_directory": wc.temp_directory,
+    }
+
+
+class ResourceGovernor:
+    """
+    Admission control for queries in one process.
+
+    Each query takes a slot of its workload class. When no slot is free,
+    callers queue and are admitted by (priority, arrival), so a waiting chat
+    query always goes ahead of waiting batch work.
+    """
+
+    def __init__(self, workloads: dict = None, max_active: int = MAX_ACTIVE_QUERIES):
+        self.workloads = workloads or WORKLOADS
+        self.max_active = max_active
+        self._cond = threading.Condition()
+        self._active = {name: 0 for name in self.workloads}
+        self._waiting = []  # heap of (priority, seq, workload)
+        self._seq = itertools.count()
+
+    def _can_start(self, ticket: tuple) -> bool:
+        if sum(self._active.values()) >= self.max_active:
+            return False
+        # The first queued query whose class has a free slot goes next
+        for waiting in sorted(self._waiting):
+            name = waiting[2]
+            if self._active[name] < self.workloads[name].slots:
+                return waiting == ticket
+        return False
+
+    @contextmanager
+    def slot(self, workload: str = "interactive"):
+        """Hold a slot of `workload` for the duration of the block"""
+        wc = self.workloads[workload]
+        ticket = (wc.priority, next(self._seq), workload)
+        with self._cond:
+            heapq.heappush(self._waiting, ticket)
+            while not self._can_start(ticket):
+                self._cond.wait()
+            self._waiting.remove(ticket)
+            heapq.heapify(self._waiting)
+            self._active[workload] += 1
+            # The next queued query may be startable now that this one left the queue
+            self._cond.notify_all()
+        try:
+            yield wc
+        finally:
+            with self._cond:
+                self._active[workload] -= 1
+                self._cond.notify_all()
+
+    def status(self) -> dict:
+        """Running and queued queries per workload class"""
+        with self._cond:
+            return {
+                name: {"running": self._active[name],
+                       "queued": sum(1 for w in self._waiting if w[2] == name),
+                       "slots": wc.slots}
+                for name, wc in self.workloads.items()
+            }
+
+
+governor = ResourceGovernor()
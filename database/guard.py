@@ -0,0 +1,152 @@
+import json
+import re
+from dataclasses import dataclass, field
+from .connection import connect
+
+# Thresholds applied to DuckDB's EXPLAIN estimates before a generated query runs
+MAX_JOIN_ROWS = 1_000_000          # largest cross/nested-loop join we allow
+MAX_INTERMEDIATE_ROWS = 10_000_000  # largest estimate for any single operator
+RESULT_ROW_LIMIT = 1_000            # LIMIT injected into large unbounded results
+QUERY_TIMEOUT_SECONDS = 30
+
+# Join operators DuckDB falls back to when there is no usable equi-join condition
+_UNBOUNDED_JOINS = {"CROSS_PRODUCT", "NESTED_LOOP_JOIN", "BLOCKWISE_NL_JOIN", "PIECEWISE_MERGE_JOIN"}
+_LIMIT_OPERATORS = {"LIMIT", "STREAMING_LIMIT", "TOP_N", "LIMIT_PERCENT"}
+_SINGLE_ROW_OPERATORS = {"UNGROUPED_AGGREGATE", "SIMPLE_AGGREGATE"}
+# UNION [ALL] is the only set operation with its own operator; EXCEPT and
+# INTERSECT are planned as anti/semi joins
+_SET_OPERATORS = {"UNION"}
+# DuckDB estimates a GROUP BY's output as its input size, so their
+# estimates say nothing about the number of groups
+_GROUPING_OPERATORS = {"HASH_GROUP_BY", "PERFECT_HASH_GROUP_BY", "PARTITIONED_AGGREGATE"}
+# The LIMIT wrapper guard_sql puts around large results
+_GUARD_WRAPPER = re.compile(r"^SELECT \* FROM \(\n(.*)\n\) AS guarded LIMIT \d+$", re.S)
+
+
+@dataclass
+class PlanEstimate:
+    """Summary of a physical plan's estimated cost"""
+    result_rows: int = 0  # 0 when DuckDB gives no usable estimate
+    max_rows: int = 0
+    max_operator: str = ""
+    joins: list = field(default_factory=list)  # [(operator name, estimated rows)]
+    has_limit: bool = False
+
+
+def _estimated_rows(node: dict) -> int:
+    extra = node.get("extra_info") or {}
+    if not isinstance(extra, dict):
+        return 0
+    try:
+        return int(extra.get("Estimated Cardinality", 0))
+    except (TypeError, ValueError):
+        return 0
+
+
+def _output_rows(node: dict) -> int:
+    """Estimated output of an operator, derived from its inputs when DuckDB omits it"""
+    rows = _estimated_rows(node)
+    if rows:
+        return rows
+    children = node.get("children") or []
+    if not children:
+        return 0
+    if node.get("name") == "CROSS_PRODUCT":
+        rows = 1
+        for child in children:
+            rows *= _output_rows(child)
+        return rows
+    if node.get("name") in _SET_OPERATORS:
+        return sum(_output_rows(child) for child in children)
+    return max(_output_rows(child) for child in children)
+
+
+def estimate_plan(sql: str) -> PlanEstimate:
+    """Run EXPLAIN on a query and collect cardinality estimates and join types"""
+    con = connect(read_only=True)
+    try:
+        rows = con.execute(f"EXPLAIN (FORMAT JSON) {sql}").fetchall()
+    finally:
+        con.close()
+
+    plan = json.loads(rows[0][1])
+    estimate = PlanEstimate()
+
+    # The top of the plan is a chain of single-child operators (projection,
+    # order, limit...) down to the first operator that actually estimates rows
+    node = plan[0] if plan else {}
+    while node:
+        name = node.get("name")
+        if name in _LIMIT_OPERATORS:
+            estimate.has_limit = True
+        if name in _SINGLE_ROW_OPERATORS:
+            estimate.result_rows = 1
+            break
+        if name in _GROUPING_OPERATORS:
+            break
+        if name in _SET_OPERATORS:
+            estimate.result_rows = _output_rows(node)
+            break
+        rows_here = _estimated_rows(node)
+        if rows_here:
+            estimate.result_rows = rows_here
+            break
+        children = node.get("children") or []
+        node = children[0] if len(children) == 1 else None
+
+    stack = list(plan)
+    while stack:
+        node = stack.pop()
+        name = node.get("name", "")
+        rows_here = _output_rows(node)
+        if rows_here > estimate.max_rows:
+            estimate.max_rows = rows_here
+            estimate.max_operator = name
+        if "JOIN" in name or name == "CROSS_PRODUCT":
+            estimate.joins.append((name, rows_here))
+        stack.extend(node.get("children") or [])
+
+    return estimate
+
+
+def guard_sql(sql: str) -> tuple[str, str, bool]:
+    """
+    Check a generated query's plan before it runs.
+    Returns: (sql_to_execute, error_message, truncated)
+    A non-empty error means the query should not run; the message explains why
+    so the model can rewrite it. When the query may return more than
+    RESULT_ROW_LIMIT rows (by the estimate, or because there is no usable
+    estimate) it comes back wrapped in a LIMIT and truncated is True: the
+    result may be cut short, which only the executed row count can confirm.
+    """
+    sql = sql.strip().rstrip(";").strip()
+
+    try:
+        estimate = estimate_plan(sql)
+    except Exception as e:
+        return sql, str(e), False
+
+    for name, rows in estimate.joins:
+        if name in _UNBOUNDED_JOINS and rows > MAX_JOIN_ROWS:
+            return sql, (
+                f"Query rejected: the plan contains a {name} estimated at {rows:,} rows "
+                f"(limit {MAX_JOIN_ROWS:,}). Join the tables on a key column such as "
+                f"account_id instead of a cross join or non-equality condition."
+            ), False
+
+    if estimate.max_rows > MAX_INTERMEDIATE_ROWS:
+        return sql, (
+            f"Query rejected: the {estimate.max_operator} step is estimated at "
+            f"{estimate.max_rows:,} rows (limit {MAX_INTERMEDIATE_ROWS:,}). "
+            f"Filter or aggregate earlier, or use a more selective join."
+        ), False
+
+    if not estimate.has_limit and (estimate.result_rows > RESULT_ROW_LIMIT or not estimate.result_rows):
+        return f"SELECT * FROM (\n{sql}\n) AS guarded LIMIT {RESULT_ROW_LIMIT}", "", True
+
+    return sql, "", False
+
+
+def unguard_sql(sql: str) -> str:
+    """The query guard_sql wrapped in its LIMIT, or `sql` unchanged if it was not wrapped"""
+    return _GUARD_WRAPPER.sub(r"\1", sql)
@@ -0,0 +1,350 @@
+"""
+Persistent history of executed queries.
+
+Every query run through db_query/db_query_arrow is recorded with its
+normalized fingerprint, latency, row count and the tool, agent and question
+it ran for. Records are buffered in memory and written to a separate local
+DuckDB file by a background thread, so recording never adds a write to the
+query path and the sales database stays read-only.
+
+    python -m database.history --top 10
+prints the slowest and most frequent query shapes with suggestions for
+views, rollups or indexes worth materializing.
+"""
+import argparse
+import atexit
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+import duckdb
+import pandas as pd
+
+HISTORY_DB_PATH = os.getenv("QUERY_HISTORY_PATH", "db/query_history.duckdb")  # empty disables recording
+FLUSH_INTERVAL_SECONDS = 5
+MAX_BUFFERED_RECORDS = 10_000
+# Shapes slower than this at the median, run at least MIN_RUNS times, are materialization candidates
+SLOW_QUERY_MS = 500
+MIN_RUNS = 3
+# How long learned examples are reused before re-reading the history
+EXAMPLES_TTL_SECONDS = 600
+
+_COLUMNS = ["executed_at", "fingerprint", "normalized_sql", "sql", "tool", "sales_agent", "question",
+            "attempt", "ok", "error", "latency_ms", "rows", "plan_summary"]
+
+_CREATE_SQL = """
+    CREATE TABLE IF NOT EXISTS query_history (
+        executed_at    TIMESTAMP,
+        fingerprint    VARCHAR,
+        normalized_sql VARCHAR,
+        sql            VARCHAR,
+        tool           VARCHAR,
+        sales_agent    VARCHAR,
+        question       VARCHAR,
+        attempt        INTEGER,
+        ok             BOOLEAN,
+        error          VARCHAR,
+        latency_ms     DOUBLE,
+        rows           BIGINT,
+        plan_summary   VARCHAR
+    )
+"""
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_EQUALITY_FILTER = re.compile(r"\b(?:(\w+)\.)?(\w+)\s*=\s*\?")
+_buffer = deque(maxlen=MAX_BUFFERED_RECORDS)
+_flush_lock = threading.Lock()
+_flusher = None
+_flusher_lock = threading.Lock()
+_tags: ContextVar[dict] = ContextVar("query_tags", default={})
+_examples_cache = {"at": 0.0, "text": ""}
+
+
+def normalize_sql(sql: str) -> str:
+    """
+    Query text with literals replaced by ?, case and whitespace folded. The
+    guard's LIMIT wrapper is dropped, so capped and uncapped runs of a query
+    share a shape.
+    """
+    from .guard import unguard_sql
+
+    text = _STRING_LITERAL.sub("?", unguard_sql(sql.strip()))
+    text = _NUMBER.sub("?", text)
+    text = " ".join(text.split()).lower().rstrip(";").strip()
+    return _IN_LIST.sub("(?)", text)
+
+
+def fingerprint(sql: str) -> str:
+    """Stable id of a query's shape: equal for queries differing only in literals"""
+    return hashlib.md5(normalize_sql(sql).encode()).hexdigest()[:16]
+
+
+@contextmanager
+def tagged(**tags):
+    """Attach tags (tool, sales_agent, question, attempt) to queries run inside the block"""
+    reset = _tags.set({**_tags.get(), **tags})
+    try:
+        yield
+    finally:
+        _tags.reset(reset)
+
+
+def record(sql: str, latency_s: float, rows: int = None, error: str = ""):
+    """Buffer one executed query; written out by the background flusher"""
+    if not HISTORY_DB_PATH:
+        return
+    tags = _tags.get()
+    _buffer.append({
+        "executed_at": datetime.now(),
+        "fingerprint": fingerprint(sql),
+        "normalized_sql": normalize_sql(sql),
+        "sql": sql,
+        "tool": tags.get("tool", "app"),
+        "sales_agent": tags.get("sales_agent"),
+        "question": tags.get("question"),
+        "attempt": tags.get("attempt"),
+        "ok": not error,
+        "error": error[:500] or None,
+        "latency_ms": latency_s * 1000,
+        "rows": rows,
+        "plan_summary": None,
+    })
+    _start_flusher()
+
+
+def _plan_summary(sql: str) -> str:
+    from .guard import estimate_plan
+
+    try:
+        plan = estimate_plan(sql)
+    except Exception:
+        return None
+    joins = ", ".join(f"{name}~{rows:,}" for name, rows in plan.joins[:3])
+    summary = f"result~{plan.result_rows:,} rows; peak {plan.max_operator}~{plan.max_rows:,}"
+    return summary + (f"; joins {joins}" if joins else "")
+
+
+def flush() -> int:
+    """
+    Write buffered records to the history file. Another process holding the
+    file's lock leaves them buffered for the next flush.
+    Returns the number of records written.
+    """
+    with _flush_lock:
+        batch = [_buffer.popleft() for _ in range(len(_buffer))]
+        if not batch:
+            return 0
+        # EXPLAIN once per shape, here rather than on the query path
+        plans = {}
+        for rec in batch:
+            if rec["ok"] and rec["fingerprint"] not in plans:
+                plans[rec["fingerprint"]] = _plan_summary(rec["sql"])
+            rec["plan_summary"] = plans.get(rec["fingerprint"])
+        frame = pd.DataFrame(batch, columns=_COLUMNS)
+        try:
+            con = duckdb.connect(HISTORY_DB_PATH)
+        except duckdb.IOException:
+            _buffer.extendleft(reversed(batch))
+            return 0
+        try:
+            con.execute(_CREATE_SQL)
+            con.register("batch", frame)
+            con.execute(f"INSERT INTO query_history SELECT {', '.join(_COLUMNS)} FROM batch")
+        finally:
+            con.close()
+        return len(batch)
+
+
+def _flush_loop():
+    while True:
+        time.sleep(FLUSH_INTERVAL_SECONDS)
+        try:
+            flush()
+        except Exception as e:
+            print(f"Query history flush failed: {e}")
+
+
+def _start_flusher():
+    global _flusher
+    if _flusher is not None:
+        return
+    with _flusher_lock:
+        if _flusher is None:
+            _flusher = threading.Thread(target=_flush_loop, name="query-history", daemon=True)
+            _flusher.start()
+            atexit.register(flush)
+
+
+def load_history() -> pd.DataFrame:
+    """
+    All recorded queries. Records still buffered in this process are included
+    without their plan summary; nothing is flushed, so reading stays cheap
+    enough for the query path.
+    """
+    pending = pd.DataFrame(list(_buffer), columns=_COLUMNS)
+    if not HISTORY_DB_PATH or not os.path.exists(HISTORY_DB_PATH):
+        return pending
+    con = duckdb.connect(HISTORY_DB_PATH, read_only=True)
+    try:
+        stored = con.execute(f"SELECT {', '.join(_COLUMNS)} FROM query_history").fetchdf()
+    finally:
+        con.close()
+    return stored if pending.empty else pd.concat([stored, pending], ignore_index=True)
+
+
+def query_shapes(history: pd.DataFrame) -> pd.DataFrame:
+    """Runs, latency percentiles, rows and failures per query fingerprint"""
+    if history.empty:
+        return pd.DataFrame()
+    shapes = history.groupby("fingerprint").agg(
+        runs=("ok", "size"),
+        failures=("ok", lambda s: int((~s).sum())),
+        p50_ms=("latency_ms", "median"),
+        p95_ms=("latency_ms", lambda s: s.quantile(0.95)),
+        total_ms=("latency_ms", "sum"),
+        avg_rows=("rows", "mean"),
+        tools=("tool", lambda s: ", ".join(sorted(s.dropna().unique()))),
+        normalized_sql=("normalized_sql", "first"),
+        plan_summary=("plan_summary", lambda s: s.dropna().iloc[-1] if s.notna().any() else None),
+    )
+    return shapes.reset_index()
+
+
+def _indexed_columns() -> set:
+    from .connection import connect
+
+    con = connect(read_only=True)
+    try:
+        indexes = con.execute("SELECT table_name, expressions FROM duckdb_indexes()").fetchall()
+    finally:
+        con.close()
+    return {(table, expr.strip("[]'\" ").lower()) for table, exprs in indexes for expr in [str(exprs)]}
+
+
+def _table_columns() -> dict:
+    """column name -> tables (not views) that have it"""
+    from .connection import connect
+
+    con = connect(read_only=True)
+    try:
+        rows = con.execute("""
+            SELECT c.column_name, c.table_name
+            FROM duckdb_columns() c
+            JOIN duckdb_tables() t USING (schema_name, table_name)
+            WHERE c.schema_name = 'main'
+        """).fetchall()
+    finally:
+        con.close()
+    columns = {}
+    for column, table in rows:
+        columns.setdefault(column.lower(), set()).add(table)
+    return columns
+
+
+def materialization_hints(shapes: pd.DataFrame) -> list:
+    """
+    Suggestions drawn from recurring shapes: slow aggregates are rollup or
+    materialized-view candidates, and equality filters on unindexed table
+    columns are index candidates for point lookups.
+    """
+    if shapes.empty:
+        return []
+    hints = []
+    recurring = shapes[shapes["runs"] >= MIN_RUNS]
+
+    slow = recurring[recurring["p50_ms"] >= SLOW_QUERY_MS].sort_values("total_ms", ascending=False)
+    for _, shape in slow.iterrows():
+        kind = "a rollup table refreshed by the loaders" if "group by" in shape["normalized_sql"] \
+            else "a materialized table or a view over a pre-joined table"
+        hints.append(
+            f"[{shape['fingerprint']}] runs {shape['runs']}x at p50 {shape['p50_ms']:.0f} ms "
+            f"({shape['total_ms'] / 1000:.1f} s total): consider {kind}. Plan: {shape['plan_summary']}"
+        )
+
+    indexed = _indexed_columns()
+    columns = _table_columns()
+    filters = {}
+    for _, shape in recurring.iterrows():
+        for _, column in _EQUALITY_FILTER.findall(shape["normalized_sql"]):
+            for table in columns.get(column, ()):
+                if (table, column) not in indexed and re.search(rf"\b{table}\b", shape["normalized_sql"]):
+                    filters[(table, column)] = filters.get((table, column), 0) + shape["runs"]
+    for (table, column), runs in sorted(filters.items(), key=lambda kv: -kv[1]):
+        hints.append(
+            f"{table}.{column} is filtered by equality in {runs} runs and has no index: "
+            f"CREATE INDEX idx_{table}_{column} ON {table}({column}) helps if the filter is selective."
+        )
+    return hints
+
+
+def top_examples(limit: int = 5) -> list:
+    """
+    (question, sql) pairs for the most often successful text_to_sql shapes,
+    newest question per shape. Only shapes that never failed and returned rows.
+    """
+    from .guard import unguard_sql
+    try:
+        history = load_history()
+    except Exception:
+        return []
+    history = history[(history["tool"] == "text_to_sql") & history["question"].notna()]
+    if history.empty:
+        return []
+    by_shape = history.groupby("fingerprint")
+    good = by_shape.filter(lambda g: g["ok"].all() and (g["rows"].fillna(0) > 0).all())
+    if good.empty:
+        return []
+    runs = good.groupby("fingerprint").size().sort_values(ascending=False).head(limit)
+    latest = good.sort_values("executed_at").groupby("fingerprint").last()
+    return [(latest.at[fp, "question"], unguard_sql(latest.at[fp, "sql"])) for fp in runs.index]
+
+
+def learned_examples(limit: int = 5) -> str:
+    """top_examples formatted for the SQL prompt, re-read every EXAMPLES_TTL_SECONDS"""
+    now = time.monotonic()
+    if _examples_cache["at"] and now - _examples_cache["at"] < EXAMPLES_TTL_SECONDS:
+        return _examples_cache["text"]
+    examples = top_examples(limit)
+    text = ""
+    if examples:
+        text = "EXAMPLES FROM PAST SUCCESSFUL QUERIES:\n\n" + "\n\n".join(
+            f'Q: "{question}"\nA: {sql}' for question, sql in examples
+        )
+    _examples_cache.update(at=now, text=text)
+    return text
+
+
+def report(top: int = 10) -> str:
+    """Slowest and most frequent query shapes, plus materialization hints"""
+    flush()
+    shapes = query_shapes(load_history())
+    if shapes.empty:
+        return "No queries recorded yet."
+    columns = ["fingerprint", "runs", "failures", "p50_ms", "p95_ms", "avg_rows", "tools", "normalized_sql"]
+    view = shapes[columns].copy()
+    view["normalized_sql"] = view["normalized_sql"].str.slice(0, 90)
+    sections = [
+        "SLOWEST SHAPES (by p95 latency)",
+        view.sort_values("p95_ms", ascending=False).head(top).round(1).to_string(index=False),
+        "",
+        "MOST FREQUENT SHAPES",
+        view.sort_values("runs", ascending=False).head(top).round(1).to_string(index=False),
+        "",
+        "MATERIALIZATION HINTS",
+        "\n".join(materialization_hints(shapes)) or "None: no recurring slow shapes or unindexed filters.",
+    ]
+    return "\n".join(sections)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--top", type=int, default=10, help="Shapes to list per section")
+    args = parser.parse_args()
+    print(report(args.top))
@@ -0,0 +1,62 @@
+import json
+import threading
+import duckdb
+
+_local = threading.local()
+
+
+def _parser_connection() -> duckdb.DuckDBPyConnection:
+    """In-memory connection per thread; parsing never touches the sales DB."""
+    con = getattr(_local, "con", None)
+    if con is None:
+        con = duckdb.connect(":memory:")
+        _local.con = con
+    return con
+
+
+def parse_sql(sql: str) -> dict:
+    """
+    Parse SQL with DuckDB's own parser via json_serialize_sql.
+
+    Returns the serialized parse tree. On failure the dict has "error": True
+    plus "error_type" and "error_message"; non-SELECT statements fail with
+    error_type "not implemented".
+    """
+    raw = _parser_connection().execute("SELECT json_serialize_sql(?)", [sql]).fetchone()[0]
+    return json.loads(raw)
+
+
+def referenced_relations(tree) -> tuple[set, set, set]:
+    """
+    Walk a parse tree and collect what the query reads from.
+    Returns: (tables, table_functions, cte_names)
+    Tables are (schema_name, table_name) pairs with names lowercased; a
+    catalog-qualified name keeps its catalog in the schema part
+    ("other_db.main"), so it never looks like a table of this database.
+    """
+    tables, functions, ctes = set(), set(), set()
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, list):
+            stack.extend(node)
+            continue
+        if not isinstance(node, dict):
+            continue
+
+        node_type = node.get("type")
+        if node_type == "BASE_TABLE":
+            schema = ".".join(filter(None, [node.get("catalog_name", ""), node.get("schema_name", "")]))
+            tables.add((schema.lower(), node.get("table_name", "").lower()))
+        elif node_type == "TABLE_FUNCTION":
+            function = node.get("function") or {}
+            functions.add(function.get("function_name", "").lower())
+
+        cte_map = node.get("cte_map")
+        if isinstance(cte_map, dict):
+            for entry in cte_map.get("map", []):
+                ctes.add(entry.get("key", "").lower())
+
+        stack.extend(v for v in node.values() if isinstance(v, (dict, list)))
+
+    return tables, functions, ctes
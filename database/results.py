@@ -0,0 +1,135 @@
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, Future
+from dataclasses import dataclass
+from typing import Optional
+import pyarrow as pa
+from .connection import connect, db_query_arrow
+from .execution import execute
+from .governor import governor
+from .guard import unguard_sql, RESULT_ROW_LIMIT
+
+EXPORT_DIR = "exports"
+EXPORT_FORMATS = {
+    "csv": "(FORMAT csv, HEADER)",
+    "parquet": "(FORMAT parquet, COMPRESSION zstd)",
+}
+EXPORT_TIMEOUT_SECONDS = 300
+EXPORT_TTL_SECONDS = 3600  # exported files older than this are deleted
+DEFAULT_PAGE_SIZE = 50
+MAX_CACHED_RESULTS = 32  # per process, shared by all sessions
+
+_EXPORT_EXECUTOR = ThreadPoolExecutor(max_workers=2, thread_name_prefix="export")
+
+
+@dataclass(frozen=True)
+class QueryResult:
+    """
+    A query result kept server-side as an Arrow table for paging and export.
+
+    When the guard's LIMIT cut the result short, `table` holds only the first
+    RESULT_ROW_LIMIT rows and `truncated` is set; `export_sql` is the query
+    without the cap, so an export writes every row.
+    """
+    result_id: str
+    sql: str
+    table: pa.Table
+    export_sql: str
+    truncated: bool
+
+    @property
+    def num_rows(self) -> int:
+        return self.table.num_rows
+
+    def num_pages(self, page_size: int = DEFAULT_PAGE_SIZE) -> int:
+        return max(1, -(-self.table.num_rows // page_size))
+
+    def page(self, page: int, page_size: int = DEFAULT_PAGE_SIZE) -> pa.Table:
+        """Zero-based page of rows; slicing an Arrow table does not copy"""
+        return self.table.slice(page * page_size, page_size)
+
+
+_results: "OrderedDict[str, QueryResult]" = OrderedDict()
+_results_lock = threading.Lock()
+# Ids stored by the current thread, so a UI can pick up what a tool produced
+_recent = threading.local()
+
+
+def run_and_store(sql: str, timeout: float = None, capped: bool = False) -> QueryResult:
+    """
+    Execute a query into Arrow and keep the result for later paging/export.
+    Pass capped=True for SQL that guard_sql wrapped in its LIMIT; a result
+    that reaches the limit is then marked truncated. The uncapped query is
+    not re-run here: only an export pays for the full result.
+    """
+    table = db_query_arrow(sql, timeout=timeout)
+    export_sql = unguard_sql(sql) if capped else sql
+    result = QueryResult(uuid.uuid4().hex, sql, table, export_sql,
+                         truncated=capped and table.num_rows >= RESULT_ROW_LIMIT)
+    with _results_lock:
+        _results[result.result_id] = result
+        while len(_results) > MAX_CACHED_RESULTS:
+            _results.popitem(last=False)
+    _recent.__dict__.setdefault("ids", []).append(result.result_id)
+    return result
+
+
+def take_recent_results() -> list:
+    """Ids of results stored by this thread since the last call, oldest first"""
+    ids = _recent.__dict__.get("ids", [])
+    _recent.ids = []
+    return ids
+
+
+def get_result(result_id: str) -> Optional[QueryResult]:
+    """A stored result, or None once it has been evicted"""
+    with _results_lock:
+        result = _results.get(result_id)
+        if result is not None:
+            _results.move_to_end(result_id)
+        return result
+
+
+def _remove_old_exports():
+    cutoff = time.time() - EXPORT_TTL_SECONDS
+    for entry in os.scandir(EXPORT_DIR):
+        try:
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+        except OSError:
+            pass  # already removed by another process
+
+
+def export_query(sql: str, fmt: str, path: str = None) -> tuple[str, int]:
+    """
+    Write a query's full result to CSV or Parquet with DuckDB's COPY ... TO,
+    which streams rows to disk without materializing them in Python. The
+    COPY is interrupted after EXPORT_TIMEOUT_SECONDS, and exports older than
+    EXPORT_TTL_SECONDS are removed first.
+    Returns (file path, rows written).
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format '{fmt}'")
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    _remove_old_exports()
+    path = path or os.path.join(EXPORT_DIR, f"{uuid.uuid4().hex}.{fmt}")
+    with governor.slot("batch"):
+        con = connect(read_only=True)
+        try:
+            rows = execute(con, f"COPY ({sql}) TO '{path}' {EXPORT_FORMATS[fmt]}", None,
+                           lambda result: result.fetchone()[0], EXPORT_TIMEOUT_SECONDS)
+        except Exception:
+            if os.path.exists(path):
+                os.remove(path)
+            raise
+        finally:
+            con.close()
+    return path, rows
+
+
+def start_export(sql: str, fmt: str) -> Future:
+    """Run export_query in the background; the future resolves to (file path, rows written)"""
+    return _EXPORT_EXECUTOR.submit(export_query, sql, fmt)
@@ -0,0 +1,141 @@
+from .connection import connect
+from .governor import governor
+
+# Rollup bookkeeping lives outside the main schema so it stays out of the
+# schema prompt and cannot be queried by generated SQL.
+_STATE_TABLE = "rollup_meta.pipeline_monthly_state"
+
+# One row per deal with every dimension the rollup groups by. deal_month is
+# the close month for Won/Lost deals and the engage month otherwise; deals
+# with neither date land in the NULL month. Dimensions are stored as VARCHAR
+# so the rollup does not pin the loaders' ENUM types.
+_SOURCE_SQL = """
+    CREATE OR REPLACE TEMP TABLE rollup_source AS
+    SELECT
+        CAST(date_trunc('month', COALESCE(sp.close_date, sp.engage_date)) AS DATE) AS deal_month,
+        CAST(sp.sales_agent AS VARCHAR) AS sales_agent,
+        sp.agent_key,
+        st.manager,
+        st.regional_office,
+        CAST(sp.product AS VARCHAR)     AS product,
+        p.series,
+        a.sector,
+        CAST(sp.deal_stage AS VARCHAR)  AS deal_stage,
+        sp.close_value,
+        hash(sp.opportunity_id, CAST(sp.sales_agent AS VARCHAR), CAST(sp.product AS VARCHAR),
+             CAST(sp.deal_stage AS VARCHAR), sp.engage_date, sp.close_date, sp.close_value,
+             st.manager, st.regional_office, p.series, a.sector) AS row_hash
+    FROM sales_pipeline sp
+    LEFT JOIN sales_teams st ON st.agent_key = sp.agent_key
+    LEFT JOIN products p     ON p.product_id = sp.product_id
+    LEFT JOIN accounts a     ON a.account_id = sp.account_id
+"""
+
+
+def refresh_rollups() -> int:
+    """
+    Bring rollup_pipeline_monthly up to date with sales_pipeline and its
+    dimension tables.
+
+    Each month's source rows are fingerprinted (an XOR of per-row hashes);
+    only months whose fingerprint changed (or that disappeared) are deleted and re-aggregated, so a reload
+    that touches a few recent deals only rewrites those months.
+
+    Returns the number of months rewritten.
+    """
+    with governor.slot("ingest"):
+        con = connect(read_only=False)
+        try:
+            con.execute("CREATE SCHEMA IF NOT EXISTS rollup_meta")
+            con.execute(f"""
+                CREATE TABLE IF NOT EXISTS {_STATE_TABLE} (
+                    deal_month  DATE,
+                    fingerprint UBIGINT,
+                    refreshed_at TIMESTAMP
+                )
+            """)
+            con.execute("""
+                CREATE TABLE IF NOT EXISTS rollup_pipeline_monthly (
+                    deal_month        DATE,
+                    sales_agent       VARCHAR,
+                    agent_key         VARCHAR,
+                    manager           VARCHAR,
+                    regional_office   VARCHAR,
+                    product           VARCHAR,
+                    series            VARCHAR,
+                    sector            VARCHAR,
+                    deal_stage        VARCHAR,
+                    deal_count        BIGINT,
+                    won_count         BIGINT,
+                    lost_count        BIGINT,
+                    open_count        BIGINT,
+                    won_value         HUGEINT,
+                    total_close_value HUGEINT
+                )
+            """)
+
+            con.execute(_SOURCE_SQL)
+            con.execute(f"""
+                CREATE OR REPLACE TEMP TABLE rollup_changed AS
+                WITH fresh AS (
+                    -- Re-hash each row before combining: multi-argument hash()
+                    -- shifts by the same amount for the same change in a column,
+                    -- so a plain bit_xor lets pairs of changed rows cancel out
+                    SELECT deal_month, hash(bit_xor(hash(row_hash)), COUNT(*)) AS fingerprint
+                    FROM rollup_source
+                    GROUP BY deal_month
+                )
+                SELECT COALESCE(f.deal_month, s.deal_month) AS deal_month, f.fingerprint
+                FROM fresh f
+                FULL OUTER JOIN {_STATE_TABLE} s
+                  ON f.deal_month IS NOT DISTINCT FROM s.deal_month
+                WHERE f.fingerprint IS DISTINCT FROM s.fingerprint
+            """)
+
+            changed = con.execute("SELECT COUNT(*) FROM rollup_changed").fetchone()[0]
+            if not changed:
+                return 0
+
+            con.execute("BEGIN TRANSACTION")
+            con.execute("""
+                DELETE FROM rollup_pipeline_monthly r
+                WHERE EXISTS (
+                    SELECT 1 FROM rollup_changed c
+                    WHERE c.deal_month IS NOT DISTINCT FROM r.deal_month
+                )
+            """)
+            con.execute("""
+                INSERT INTO rollup_pipeline_monthly
+                SELECT
+                    deal_month, sales_agent, agent_key, manager, regional_office,
+                    product, series, sector, deal_stage,
+                    COUNT(*)                                                AS deal_count,
+                    COUNT(*) FILTER (WHERE deal_stage = 'Won')              AS won_count,
+                    COUNT(*) FILTER (WHERE deal_stage = 'Lost')             AS lost_count,
+                    COUNT(*) FILTER (WHERE deal_stage NOT IN ('Won', 'Lost')) AS open_count,
+                    COALESCE(SUM(close_value) FILTER (WHERE deal_stage = 'Won'), 0) AS won_value,
+                    COALESCE(SUM(close_value), 0)                           AS total_close_value
+                FROM rollup_source src
+                WHERE EXISTS (
+                    SELECT 1 FROM rollup_changed c
+                    WHERE c.deal_month IS NOT DISTINCT FROM src.deal_month
+                )
+                GROUP BY ALL
+            """)
+            con.execute(f"""
+                DELETE FROM {_STATE_TABLE} s
+                WHERE EXISTS (
+                    SELECT 1 FROM rollup_changed c
+                    WHERE c.deal_month IS NOT DISTINCT FROM s.deal_month
+                )
+            """)
+            con.execute(f"""
+                INSERT INTO {_STATE_TABLE}
+                SELECT deal_month, fingerprint, now()
+                FROM rollup_changed
+                WHERE fingerprint IS NOT NULL
+            """)
+            con.execute("COMMIT")
+            return changed
+        finally:
+            con.close()
@@ -1,9 +1,18 @@
-import duckdb
-from .connection import DB_PATH
+from functools import lru_cache
+from .connection import connect, data_version
+
 
 def get_schema_info() -> str:
-    """Extract database schema with sample values for better context"""
-    con = duckdb.connect(DB_PATH, read_only=True)
+    """
+    Extract database schema with sample values for better context.
+    Cached until the database changes, so a reload refreshes the prompt.
+    """
+    return _schema_info(data_version())
+
+
+@lru_cache(maxsize=1)
+def _schema_info(version: tuple) -> str:
+    con = connect(read_only=True)
     try:
         # Get all tables and views
         tables_df = con.execute("""
@@ -33,12 +42,15 @@ def get_schema_info() -> str:
             for _, col in columns_df.iterrows():
                 col_name = col['column_name']
                 col_type = col['data_type']
+                # ENUM types spell out every value; the examples already show some
+                if col_type.startswith('ENUM('):
+                    col_type = 'ENUM'
                 
                 # Get sample values for this column
                 try:
                     # Special handling for text fields - don't show full content
                     if col_type in ['VARCHAR', 'TEXT'] and col_name.lower() in ['comment', 'description', 'notes']:
-                        schema_info.append(f"  - {col_name} ({col_type}) [contains text notes]")
+                        schema_info.append(f"  - {col_name} ({col_type}) [contains text notes; search them with the search_notes tool]")
                     else:
                         samples = con.execute(f"""
                             SELECT DISTINCT {col_name}
@@ -63,6 +75,25 @@ def get_schema_info() -> str:
         con.close()
 
 
+def get_relation_names() -> frozenset:
+    """Lowercased names of the tables and views in the main schema, cached until the database changes"""
+    return _relation_names(data_version())
+
+
+@lru_cache(maxsize=1)
+def _relation_names(version: tuple) -> frozenset:
+    con = connect(read_only=True)
+    try:
+        rows = con.execute("""
+            SELECT table_name
+            FROM information_schema.tables
+            WHERE table_schema = 'main'
+        """).fetchall()
+        return frozenset(r[0].lower() for r in rows)
+    finally:
+        con.close()
+
+
 def get_business_context() -> str:
     """Provide business context and table relationships"""
     return """
@@ -75,13 +106,21 @@ def get_business_context() -> str:
     - sales_teams.sales_agent → sales_pipeline.sales_agent (one-to-many)
 
     IMPORTANT VIEWS (use these for common queries):
-    - v_open_work: Outstanding work items (deals in 'Engaging' stage from last 30 days)
+    - v_open_work: Outstanding work items (deals in 'Engaging' stage from last 30 days, one row per agent and account)
     - v_pipeline_snapshot: Current state of all deals
     - v_accounts_summary: Account overview with last touch date
     - v_interactions_norm: Normalized interaction history
 
+    PRE-AGGREGATED ROLLUP (use this for counts, win rates and revenue totals):
+    - rollup_pipeline_monthly: one row per deal_month × sales_agent × manager × regional_office
+      × product × series × sector × deal_stage, with deal_count, won_count, lost_count,
+      open_count, won_value and total_close_value.
+      deal_month is the close month for Won/Lost deals and the engage month otherwise.
+      Only go to sales_pipeline for per-deal detail.
+
     BUSINESS RULES:
     - Deal stages: Prospecting → Engaging → Won/Lost
+    - To filter by sales agent, use the indexed key: agent_key = LOWER('Agent Name')
     - "Outstanding items" or "open work" = deals in 'Engaging' stage
     - "Last touch" = most recent interaction date with an account
 
@@ -105,5 +144,17 @@ A: SELECT DISTINCT a.account_id, a.account, sp.sales_agent
 Q: "Which accounts haven't been contacted recently?"
 A: SELECT account_id, account_name, last_touch FROM v_accounts_summary WHERE last_touch < CURRENT_DATE - INTERVAL '30 days';
 
+Q: "What is the win rate by sales agent?"
+A: SELECT sales_agent, SUM(won_count) * 1.0 / NULLIF(SUM(won_count) + SUM(lost_count), 0) AS win_rate
+   FROM rollup_pipeline_monthly GROUP BY sales_agent ORDER BY win_rate DESC;
+
+Q: "Revenue by sector and month"
+A: SELECT sector, deal_month, SUM(won_value) AS revenue
+   FROM rollup_pipeline_monthly GROUP BY sector, deal_month ORDER BY deal_month, sector;
+
+Q: "How many deals are in each stage per product?"
+A: SELECT product, deal_stage, SUM(deal_count) AS deals
+   FROM rollup_pipeline_monthly GROUP BY product, deal_stage ORDER BY product, deal_stage;
+
 CRITICAL: When querying the 'accounts' table, the company name column is 'account' NOT 'account_name'.
     """
\ No newline at end of file
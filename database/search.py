@@ -0,0 +1,184 @@
+import os
+from functools import lru_cache
+from typing import Optional
+import numpy as np
+import pandas as pd
+from .connection import connect, db_query
+from .governor import governor
+
+# Semantic index over interactions.comment, keyed by interactions.interaction_id
+SEARCH_INDEX_PATH = "db/comments.faiss"
+EMBEDDING_MODEL = "text-embedding-3-small"
+EMBEDDING_BATCH_SIZE = 256
+_HNSW_NEIGHBORS = 32
+
+# Columns returned by every search, in addition to "score"
+_HIT_COLUMNS = """
+    i.interaction_id,
+    i.account_id,
+    i.account_name,
+    i.contact_name,
+    i.activity_type,
+    CAST(i.timestamp AS DATE) AS interaction_date,
+    i.comment
+"""
+
+
+def _agent_filter(sales_agent: Optional[str]) -> tuple[str, dict]:
+    """SQL clause restricting hits to an agent's accounts, and its bound parameters"""
+    if not sales_agent:
+        return "", {}
+    return """
+        AND i.account_id IN (
+            SELECT account_id FROM sales_pipeline
+            WHERE agent_key = LOWER(TRIM($agent))
+        )
+    """, {"agent": sales_agent}
+
+
+def _embed(texts: list) -> np.ndarray:
+    """Embed texts with OpenAI and L2-normalize them for inner-product search"""
+    from openai import OpenAI
+    client = OpenAI()
+    vectors = []
+    for start in range(0, len(texts), EMBEDDING_BATCH_SIZE):
+        batch = texts[start:start + EMBEDDING_BATCH_SIZE]
+        response = client.embeddings.create(model=EMBEDDING_MODEL, input=batch)
+        vectors.extend(item.embedding for item in response.data)
+    matrix = np.asarray(vectors, dtype="float32")
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
+
+
+def _new_index(dim: int):
+    import faiss
+    hnsw = faiss.IndexHNSWFlat(dim, _HNSW_NEIGHBORS, faiss.METRIC_INNER_PRODUCT)
+    return faiss.IndexIDMap2(hnsw)
+
+
+def refresh_search_index():
+    """
+    Rebuild the BM25 index and bring the FAISS index in line with the comments.
+
+    Called by the loaders after each ingest. BM25 statistics are corpus-wide,
+    so DuckDB rebuilds that index in full; embeddings are the expensive part
+    and only new interaction_ids are sent to the embedding API. Vectors of
+    comments that were removed or changed (a changed comment gets a new id)
+    are dropped so they do not take up top-k slots.
+
+    Returns the number of comments embedded.
+    """
+    with governor.slot("ingest"):
+        con = connect(read_only=False)
+        try:
+            con.execute("INSTALL fts; LOAD fts;")
+            con.execute("PRAGMA create_fts_index('interactions', 'interaction_id', 'comment', overwrite=1)")
+            notes = con.execute("""
+                SELECT interaction_id, comment
+                FROM interactions
+                WHERE comment IS NOT NULL AND TRIM(comment) <> ''
+            """).fetchdf()
+        finally:
+            con.close()
+
+    import faiss
+
+    index = None
+    changed = False
+    if os.path.exists(SEARCH_INDEX_PATH):
+        index = faiss.read_index(SEARCH_INDEX_PATH)
+        known = faiss.vector_to_array(index.id_map)
+        live = np.isin(known, notes["interaction_id"].to_numpy())
+        if not live.all():
+            # HNSW cannot delete, so rebuild from the surviving vectors; they
+            # are read back from the index rather than embedded again
+            kept = known[live]
+            rebuilt = _new_index(index.d)
+            if len(kept):
+                rebuilt.add_with_ids(np.vstack([index.reconstruct(int(i)) for i in kept]), kept)
+            index, changed = rebuilt, True
+        notes = notes[~notes["interaction_id"].isin(known)]
+
+    if not notes.empty:
+        vectors = _embed(notes["comment"].tolist())
+        if index is None:
+            index = _new_index(vectors.shape[1])
+        index.add_with_ids(vectors, notes["interaction_id"].to_numpy(dtype="int64"))
+        changed = True
+
+    if changed:
+        faiss.write_index(index, SEARCH_INDEX_PATH)
+        _load_index.cache_clear()
+    return len(notes)
+
+
+@lru_cache(maxsize=1)
+def _load_index(mtime: float):
+    import faiss
+    return faiss.read_index(SEARCH_INDEX_PATH)
+
+
+def semantic_index_available() -> bool:
+    return os.path.exists(SEARCH_INDEX_PATH)
+
+
+def keyword_search(query: str, limit: int = 10, sales_agent: Optional[str] = None) -> pd.DataFrame:
+    """BM25 full-text search over interaction comments"""
+    agent_clause, agent_params = _agent_filter(sales_agent)
+    return db_query(f"""
+        SELECT {_HIT_COLUMNS}, hits.score
+        FROM (
+            SELECT interaction_id,
+                   fts_main_interactions.match_bm25(interaction_id, $query) AS score
+            FROM interactions
+        ) hits
+        JOIN interactions i USING (interaction_id)
+        WHERE hits.score IS NOT NULL
+        {agent_clause}
+        ORDER BY hits.score DESC
+        LIMIT {int(limit)}
+    """, {"query": query, **agent_params})
+
+
+def semantic_search(query: str, limit: int = 10, sales_agent: Optional[str] = None) -> pd.DataFrame:
+    """Nearest-neighbour search over comment embeddings"""
+    index = _load_index(os.path.getmtime(SEARCH_INDEX_PATH))
+    # Over-fetch when filtering by agent, since the filter runs after the ANN lookup
+    k = int(limit) * (10 if sales_agent else 1)
+    scores, ids = index.search(_embed([query]), k)
+    found = pd.DataFrame({"interaction_id": ids[0], "score": scores[0]})
+    found = found[found["interaction_id"] >= 0]
+    if found.empty:
+        return found
+
+    agent_clause, agent_params = _agent_filter(sales_agent)
+    hits = db_query(f"""
+        SELECT {_HIT_COLUMNS}
+        FROM interactions i
+        WHERE i.interaction_id IN (SELECT UNNEST($ids))
+        {agent_clause}
+    """, {"ids": found["interaction_id"].tolist(), **agent_params})
+    return (
+        hits.merge(found, on="interaction_id")
+        .sort_values("score", ascending=False)
+        .head(limit)
+    )
+
+
+def hybrid_search(query: str, limit: int = 10, sales_agent: Optional[str] = None) -> pd.DataFrame:
+    """Combine keyword and semantic rankings with reciprocal rank fusion"""
+    ranked = [
+        keyword_search(query, limit * 2, sales_agent),
+        semantic_search(query, limit * 2, sales_agent),
+    ]
+    fused = {}
+    rows = {}
+    for hits in ranked:
+        for rank, row in enumerate(hits.itertuples(index=False)):
+            fused[row.interaction_id] = fused.get(row.interaction_id, 0.0) + 1.0 / (60 + rank)
+            rows.setdefault(row.interaction_id, row._asdict())
+    if not fused:
+        return ranked[0]
+
+    result = pd.DataFrame([{**rows[i], "score": s} for i, s in fused.items()])
+    return result.sort_values("score", ascending=False).head(limit)
@@ -1,34 +1,35 @@
+import os
+import sys
 from pathlib import Path
-import duckdb, pandas as pd
 
-DATA = Path("data")
+ROOT = Path(__file__).resolve().parent.parent
+SQL  = ROOT / "sql"
 DB   = Path("db/sales.duckdb")
 DB.parent.mkdir(parents=True, exist_ok=True)
 
-tables = {
-    "accounts": "accounts.csv",
-    "products": "products.csv",
-    "interactions": "interactions.csv",
-    "sales_pipeline": "sales_pipeline.csv",
-    "sales_teams": "sales_teams.csv",
-}
+# Run this process with the ingest workload's threads, memory and spill directory
+os.environ.setdefault("DUCKDB_WORKLOAD", "ingest")
+sys.path.append(str(ROOT))
+from database.connection import connect
+from database.rollups import refresh_rollups
+from database.search import refresh_search_index
 
-con = duckdb.connect(DB.as_posix())
+con = connect(read_only=False)
 
-
-for t, f in tables.items():
-    df = pd.read_csv(DATA / f)
-    con.execute(f"DROP TABLE IF EXISTS {t}")
-    con.register(f"df_{t}", df)
-    con.execute(f"CREATE TABLE {t} AS SELECT * FROM df_{t}")
+# Typed tables, ENUM reference columns, sort order and indexes
+con.execute((SQL / "load_base.sql").read_text())
+# Views reference the derived columns (agent_key), so rebuild them after the load
+con.execute((SQL / "views.sql").read_text())
 
 print("Loaded tables:", [r[0] for r in con.execute("SHOW TABLES").fetchall()])
+print("Indexes:", [r[0] for r in con.execute("SELECT index_name FROM duckdb_indexes() ORDER BY 1").fetchall()])
 
+con.close()
 
-for maybe_key in ["id","account_id","owner_id","pipeline_id"]:
-    for t in tables:
-        cols = [c[0] for c in con.execute(f"DESCRIBE {t}").fetchall()]
-        if maybe_key in cols:
-            con.execute(f"CREATE INDEX IF NOT EXISTS idx_{t}_{maybe_key} ON {t}({maybe_key})")
+print(f"Rollups refreshed ({refresh_rollups()} months rewritten)")
 
-con.close()
+try:
+    added = refresh_search_index()
+    print(f"Search index refreshed ({added} new comments embedded)")
+except Exception as e:
+    print(f"Search index not fully refreshed: {e}")
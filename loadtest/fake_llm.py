@@ -0,0 +1,147 @@
+"""
+Local stand-in for the OpenAI API used by the load test.
+
+Serves /v1/chat/completions and /v1/embeddings with canned, shape-correct
+responses after a configurable delay, so load tests exercise the app's own
+code paths without paying for (or waiting on) real model calls.
+
+    python loadtest/fake_llm.py --port 8765 --latency-ms 400 --jitter-ms 200
+    export OPENAI_BASE_URL=http://127.0.0.1:8765/v1 OPENAI_API_KEY=fake
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Queries the fake "SQL expert" returns, chosen at random
+CANNED_SQL = [
+    "SELECT sales_agent, COUNT(*) AS deals FROM sales_pipeline GROUP BY sales_agent ORDER BY deals DESC",
+    "SELECT deal_stage, SUM(close_value) AS value FROM sales_pipeline GROUP BY deal_stage",
+    "SELECT a.sector, COUNT(*) AS deals FROM sales_pipeline sp JOIN accounts a USING (account_id) GROUP BY a.sector",
+    "SELECT account_id, account_name, last_touch FROM v_accounts_summary ORDER BY last_touch NULLS FIRST LIMIT 20",
+]
+
+CANNED_SUGGESTIONS = [
+    {
+        "title": f"Follow up with account {n}",
+        "rationale": "This account has not been touched recently.",
+        "actions": ["Send a check-in email", "Schedule a short call"],
+    }
+    for n in range(1, 4)
+]
+
+# Tools the fake agent calls, in turn, before giving a final answer
+AGENT_TOOL_CALLS = [
+    ("open_work", {"limit": 10}),
+    ("text_to_sql", {"question": "How many deals does each agent have?"}),
+    ("search_notes", {"query": "pricing concerns", "mode": "keyword", "limit": 5}),
+]
+
+EMBEDDING_DIM = 1536
+
+
+class FakeLLMHandler(BaseHTTPRequestHandler):
+    latency_s = 0.0
+    jitter_s = 0.0
+    _calls = 0
+    _calls_lock = threading.Lock()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _delay(self):
+        time.sleep(max(0.0, self.latency_s + random.uniform(-self.jitter_s, self.jitter_s)))
+
+    def _send(self, payload: dict):
+        body = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        self._delay()
+        if self.path.endswith("/embeddings"):
+            self._send(self._embeddings(request))
+        elif self.path.endswith("/chat/completions"):
+            self._send(self._chat(request))
+        else:
+            self.send_error(404)
+
+    def _embeddings(self, request: dict) -> dict:
+        inputs = request.get("input", [])
+        inputs = [inputs] if isinstance(inputs, str) else inputs
+        data = []
+        for i, text in enumerate(inputs):
+            rng = random.Random(text)
+            data.append({"object": "embedding", "index": i,
+                         "embedding": [rng.uniform(-1, 1) for _ in range(EMBEDDING_DIM)]})
+        return {"object": "list", "data": data, "model": request.get("model", ""),
+                "usage": {"prompt_tokens": 0, "total_tokens": 0}}
+
+    def _chat(self, request: dict) -> dict:
+        messages = request.get("messages", [])
+        prompt = "\n".join(str(m.get("content") or "") for m in messages)
+        message = {"role": "assistant", "content": ""}
+        finish_reason = "stop"
+
+        if request.get("tools") and not any(m.get("role") == "tool" for m in messages):
+            with self._calls_lock:
+                FakeLLMHandler._calls += 1
+                name, args = AGENT_TOOL_CALLS[FakeLLMHandler._calls % len(AGENT_TOOL_CALLS)]
+            message["content"] = None
+            message["tool_calls"] = [{
+                "id": f"call_{FakeLLMHandler._calls}",
+                "type": "function",
+                "function": {"name": name, "arguments": json.dumps(args)},
+            }]
+            finish_reason = "tool_calls"
+        elif request.get("tools"):
+            message["content"] = "Here is a summary of what I found."
+        elif request.get("response_format", {}).get("type") == "json_schema":
+            message["content"] = json.dumps({"suggestions": CANNED_SUGGESTIONS})
+        elif "SQL" in prompt:
+            message["content"] = random.choice(CANNED_SQL)
+        else:
+            message["content"] = "OK"
+
+        return {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "fake"),
+            "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+            "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": 20,
+                      "total_tokens": len(prompt) // 4 + 20},
+        }
+
+
+def start_fake_llm(port: int = 0, latency_ms: float = 300, jitter_ms: float = 100) -> ThreadingHTTPServer:
+    """Start the fake endpoint on a daemon thread; returns the server (see server_address)"""
+    handler = type("ConfiguredFakeLLMHandler", (FakeLLMHandler,), {
+        "latency_s": latency_ms / 1000,
+        "jitter_s": jitter_ms / 1000,
+    })
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=300)
+    parser.add_argument("--jitter-ms", type=float, default=100)
+    args = parser.parse_args()
+
+    server = start_fake_llm(args.port, args.latency_ms, args.jitter_ms)
+    print(f"Fake LLM listening on http://127.0.0.1:{server.server_address[1]}/v1")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,205 @@
+"""
+Concurrent multi-user load test for the agent stack.
+
+Simulates many sales reps using the app at once: each simulated session
+loops over agent_answer, get_daily_suggestions and the tool handlers for a
+random agent, against the real DuckDB database and a local fake LLM (see
+fake_llm.py). Sessions are spread over several processes, like multiple
+Streamlit servers, with threads inside each process, like concurrent
+sessions on one server.
+
+For every concurrency level it reports throughput, latency percentiles,
+errors, DuckDB lock errors and peak memory per process.
+
+    python loadtest/run_load.py --concurrency 1,10,25,50 --processes 2 --duration 30
+"""
+import argparse
+import logging
+import multiprocessing as mp
+import os
+import random
+import resource
+import sys
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from fake_llm import start_fake_llm
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# (scenario, weight): roughly how often a session does each thing
+SCENARIO_WEIGHTS = [
+    ("agent_answer", 5),
+    ("daily_suggestions", 1),
+    ("open_work", 2),
+    ("text_to_sql", 2),
+    ("search_notes", 1),
+]
+
+# Substrings that identify DuckDB file-lock / config conflicts
+LOCK_MARKERS = ("lock", "different configuration")
+# Handlers report failures as strings rather than raising
+ERROR_PREFIXES = ("Error", "An error occurred", "SQL generation failed")
+
+
+def _classify(outcome) -> str:
+    text = str(outcome)
+    if isinstance(outcome, BaseException) or text.startswith(ERROR_PREFIXES):
+        return "lock_error" if any(m in text.lower() for m in LOCK_MARKERS) else "error"
+    return "ok"
+
+
+def _scenarios():
+    from agent import (
+        agent_answer, get_daily_suggestions, open_work_handler,
+        text_to_sql_handler, search_notes_handler, register_default_tools,
+    )
+
+    def chat(agent):
+        # Every Streamlit rerun re-registers the tools before answering
+        register_default_tools()
+        return agent_answer(f"What should {agent} focus on today, and which deals close soon?")
+
+    return {
+        "agent_answer": chat,
+        "daily_suggestions": lambda agent: get_daily_suggestions(agent),
+        "open_work": lambda agent: open_work_handler({"sales_agent": agent, "limit": 25}),
+        "text_to_sql": lambda agent: text_to_sql_handler({"question": f"How many deals does {agent} have by stage?"}),
+        "search_notes": lambda agent: search_notes_handler({"query": "pricing concerns", "mode": "keyword", "sales_agent": agent}),
+    }
+
+
+def _session(scenarios, agents, deadline, seed, records, records_lock):
+    rng = random.Random(seed)
+    names = [name for name, _ in SCENARIO_WEIGHTS]
+    weights = [weight for _, weight in SCENARIO_WEIGHTS]
+    while time.monotonic() < deadline:
+        name = rng.choices(names, weights)[0]
+        agent = rng.choice(agents)
+        start = time.perf_counter()
+        try:
+            outcome = scenarios[name](agent)
+        except Exception as e:
+            outcome = e
+        elapsed = time.perf_counter() - start
+        with records_lock:
+            records.append((name, elapsed, _classify(outcome), str(outcome)[:200]))
+
+
+def _run_process(process_index: int, sessions: int, duration: float, llm_url: str, seed: int) -> dict:
+    """Entry point of one worker process: run `sessions` threads until the deadline"""
+    os.chdir(ROOT)
+    sys.path.insert(0, str(ROOT))
+    os.environ["OPENAI_BASE_URL"] = llm_url
+    os.environ["OPENAI_API_KEY"] = "fake"
+    # The fake LLM's canned SQL must not end up in the app's query history,
+    # where it would be picked as a learned example for real prompts
+    os.environ["QUERY_HISTORY_PATH"] = ""
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+    # The agent loop prints every iteration; keep the report readable
+    sys.stdout = open(os.devnull, "w")
+
+    records, records_lock = [], threading.Lock()
+    try:
+        # Importing the database package recreates the views read-write
+        start = time.perf_counter()
+        scenarios = _scenarios()
+        from database import db_query
+        agents = db_query("SELECT sales_agent FROM sales_teams")["sales_agent"].astype(str).tolist()
+        records.append(("import", time.perf_counter() - start, "ok", ""))
+    except Exception as e:
+        records.append(("import", 0.0, _classify(e), str(e)[:200]))
+        return {"process": process_index, "records": records, "peak_rss_mb": _peak_rss_mb()}
+
+    deadline = time.monotonic() + duration
+    threads = [
+        threading.Thread(target=_session, args=(scenarios, agents, deadline, seed + i, records, records_lock))
+        for i in range(sessions)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    return {"process": process_index, "records": records, "peak_rss_mb": _peak_rss_mb()}
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_level(concurrency: int, processes: int, duration: float, llm_url: str) -> list:
+    """Run one concurrency level and return the results of every worker process"""
+    processes = max(1, min(processes, concurrency))
+    sessions = [concurrency // processes + (1 if i < concurrency % processes else 0) for i in range(processes)]
+    ctx = mp.get_context("spawn")
+    with ctx.Pool(processes) as pool:
+        return pool.starmap(_run_process, [
+            (i, sessions[i], duration, llm_url, 1000 * concurrency + 100 * i)
+            for i in range(processes)
+        ])
+
+
+def summarize(concurrency: int, duration: float, results: list) -> dict:
+    records = pd.DataFrame(
+        [r for result in results for r in result["records"]],
+        columns=["scenario", "latency_s", "outcome", "detail"],
+    )
+    requests = records[records["scenario"] != "import"]
+    ok = requests[requests["outcome"] == "ok"]["latency_s"].to_numpy()
+    p50, p95, p99 = np.percentile(ok, [50, 95, 99]) if len(ok) else (np.nan,) * 3
+    return {
+        "concurrency": concurrency,
+        "requests": len(requests),
+        "throughput_rps": round(len(ok) / duration, 2),
+        "p50_s": round(p50, 3),
+        "p95_s": round(p95, 3),
+        "p99_s": round(p99, 3),
+        "errors": int((records["outcome"] == "error").sum()),
+        "lock_errors": int((records["outcome"] == "lock_error").sum()),
+        "peak_rss_mb": ", ".join(f"{r['peak_rss_mb']:.0f}" for r in results),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", default="1,10,25,50",
+                        help="Comma-separated numbers of simultaneous sessions to test")
+    parser.add_argument("--processes", type=int, default=2, help="Worker processes per level")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds per level")
+    parser.add_argument("--llm-latency-ms", type=float, default=400)
+    parser.add_argument("--llm-jitter-ms", type=float, default=150)
+    parser.add_argument("--llm-url", help="Use an already running OpenAI-compatible endpoint")
+    parser.add_argument("--csv", help="Also write the summary table to this CSV file")
+    args = parser.parse_args()
+
+    llm_url = args.llm_url
+    if not llm_url:
+        server = start_fake_llm(0, args.llm_latency_ms, args.llm_jitter_ms)
+        llm_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+    rows = []
+    for concurrency in [int(c) for c in args.concurrency.split(",")]:
+        print(f"Running {concurrency} concurrent sessions for {args.duration:.0f}s...", flush=True)
+        results = run_level(concurrency, args.processes, args.duration, llm_url)
+        rows.append(summarize(concurrency, args.duration, results))
+
+        failures = [r for result in results for r in result["records"] if r[2] != "ok"]
+        for scenario, _, outcome, detail in failures[:3]:
+            print(f"  {outcome} in {scenario}: {detail}")
+
+    summary = pd.DataFrame(rows)
+    print()
+    print(summary.to_string(index=False))
+    if args.csv:
+        summary.to_csv(args.csv, index=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,90 @@
 PRAGMA disable_progress_bar;
 
-CREATE OR REPLACE TABLE accounts       AS SELECT * FROM read_csv_auto('data/accounts.csv',        header=true);
-CREATE OR REPLACE TABLE products       AS SELECT * FROM read_csv_auto('data/products.csv',        header=true);
-CREATE OR REPLACE TABLE interactions   AS SELECT * FROM read_csv_auto('data/interactions.csv',    header=true);
-CREATE OR REPLACE TABLE sales_pipeline AS SELECT * FROM read_csv_auto('data/sales_pipeline.csv',  header=true);
-CREATE OR REPLACE TABLE sales_teams    AS SELECT * FROM read_csv_auto('data/sales_teams.csv',     header=true);
+-- 1) Raw typed loads (read_csv_auto detects DATE/BIGINT/DOUBLE columns)
+CREATE OR REPLACE TEMP TABLE raw_accounts       AS SELECT * FROM read_csv_auto('data/accounts.csv',        header=true);
+CREATE OR REPLACE TEMP TABLE raw_products       AS SELECT * FROM read_csv_auto('data/products.csv',        header=true);
+CREATE OR REPLACE TEMP TABLE raw_interactions   AS SELECT * FROM read_csv_auto('data/interactions.csv',    header=true);
+CREATE OR REPLACE TEMP TABLE raw_sales_pipeline AS SELECT * FROM read_csv_auto('data/sales_pipeline.csv',  header=true);
+CREATE OR REPLACE TEMP TABLE raw_sales_teams    AS SELECT * FROM read_csv_auto('data/sales_teams.csv',     header=true);
 
+-- 2) Dictionary-encoded reference values
+--    Tables using the ENUM types must be dropped before the types can be rebuilt.
+DROP TABLE IF EXISTS sales_pipeline;
+DROP TABLE IF EXISTS sales_teams;
+DROP TABLE IF EXISTS products;
+DROP TYPE IF EXISTS agent_name;
+DROP TYPE IF EXISTS deal_stage_name;
+DROP TYPE IF EXISTS product_name;
+
+CREATE TYPE agent_name AS ENUM (
+  SELECT DISTINCT sales_agent FROM (
+    SELECT sales_agent FROM raw_sales_teams
+    UNION ALL
+    SELECT sales_agent FROM raw_sales_pipeline
+  ) WHERE sales_agent IS NOT NULL ORDER BY 1
+);
+CREATE TYPE deal_stage_name AS ENUM (
+  SELECT DISTINCT deal_stage FROM raw_sales_pipeline WHERE deal_stage IS NOT NULL ORDER BY 1
+);
+CREATE TYPE product_name AS ENUM (
+  SELECT DISTINCT product FROM (
+    SELECT product FROM raw_products
+    UNION ALL
+    SELECT product FROM raw_sales_pipeline
+  ) WHERE product IS NOT NULL ORDER BY 1
+);
+
+-- 3) Base tables
+--    agent_key is the normalized lookup key: filter with agent_key = LOWER(TRIM(name)).
+--    Rows are sorted on the hot filter/join columns so zone maps can prune row groups.
+CREATE OR REPLACE TABLE accounts AS
+SELECT * FROM raw_accounts ORDER BY account_id;
+
+CREATE OR REPLACE TABLE products AS
+SELECT * REPLACE (CAST(product AS product_name) AS product)
+FROM raw_products
+ORDER BY product_id;
+
+CREATE OR REPLACE TABLE sales_teams AS
+SELECT
+  * REPLACE (CAST(sales_agent AS agent_name) AS sales_agent),
+  LOWER(TRIM(sales_agent)) AS agent_key
+FROM raw_sales_teams
+ORDER BY agent_key;
+
+CREATE OR REPLACE TABLE sales_pipeline AS
+SELECT
+  * REPLACE (
+    CAST(sales_agent AS agent_name)      AS sales_agent,
+    CAST(product     AS product_name)    AS product,
+    CAST(deal_stage  AS deal_stage_name) AS deal_stage
+  ),
+  LOWER(TRIM(sales_agent)) AS agent_key
+FROM raw_sales_pipeline
+ORDER BY agent_key, account_id;
+
+--    interaction_id is a content hash so it stays stable across reloads; the
+--    search indexes (database/search.py) are keyed on it. A note logged twice
+--    hashes to the same id, so only one copy is kept.
+CREATE OR REPLACE TABLE interactions AS
+SELECT
+  CAST(hash(account_id, contact_name, timestamp, comment) >> 1 AS BIGINT) AS interaction_id,
+  *
+FROM raw_interactions
+QUALIFY ROW_NUMBER() OVER (PARTITION BY interaction_id ORDER BY activity_type, status) = 1
+ORDER BY account_id, timestamp;
+
+-- 4) Indexes on the lookup keys
+CREATE INDEX idx_accounts_account_id       ON accounts(account_id);
+CREATE INDEX idx_products_product_id       ON products(product_id);
+CREATE INDEX idx_sales_teams_agent_key     ON sales_teams(agent_key);
+CREATE INDEX idx_sales_pipeline_agent_key  ON sales_pipeline(agent_key);
+CREATE INDEX idx_sales_pipeline_account_id ON sales_pipeline(account_id);
+CREATE INDEX idx_interactions_account_id   ON interactions(account_id);
+CREATE UNIQUE INDEX idx_interactions_id     ON interactions(interaction_id);
+
+DROP TABLE raw_accounts;
+DROP TABLE raw_products;
+DROP TABLE raw_interactions;
+DROP TABLE raw_sales_pipeline;
+DROP TABLE raw_sales_teams;
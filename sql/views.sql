@@ -21,11 +21,15 @@ GROUP BY account_id;
 
 
 -- 3) Open work (broader definition)
---    Treat any interaction with an "open-like" status as outstanding.
-CREATE OR REPLACE VIEW v_open_work AS
+--    'Engaging' deals engaged in the 30 days up to as_of, one row per
+--    (agent, account) with the latest interaction on or before as_of. This
+--    macro is the only definition: v_open_work applies it to today and
+--    database/analytics.py to any as_of.
+CREATE OR REPLACE MACRO open_work_as_of(as_of) AS TABLE
 SELECT
   a.account_id,
   a.sales_agent,
+  a.agent_key,
   a.product,
   a.account                     AS account_name_from_pipeline,
   a.deal_stage,
@@ -39,14 +43,18 @@ SELECT
 FROM sales_pipeline a
 LEFT JOIN v_interactions_norm b
   ON a.account_id = b.account_id
+ AND b.d_interaction <= as_of
 WHERE a.deal_stage = 'Engaging'
   AND a.account_id IS NOT NULL
-  AND TRY_CAST(a.engage_date AS DATE) >= CURRENT_DATE - 30
+  AND TRY_CAST(a.engage_date AS DATE) BETWEEN as_of - 30 AND as_of
 QUALIFY ROW_NUMBER() OVER (
-  PARTITION BY a.account_id
+  PARTITION BY a.agent_key, a.account_id
   ORDER BY b.ts_interaction DESC NULLS LAST
 ) = 1;
 
+CREATE OR REPLACE VIEW v_open_work AS
+SELECT * FROM open_work_as_of(CURRENT_DATE);
+
 
 
 -- Convenience: just items with interaction today
@@ -62,6 +70,7 @@ SELECT
   sp.product,
   sp.account              AS account_name_from_pipeline,
   sp.sales_agent,
+  sp.agent_key,
   TRY_CAST(sp.engage_date AS DATE) AS engage_date,
   TRY_CAST(sp.close_date  AS DATE) AS close_date,
   sp.close_value                      AS amount,
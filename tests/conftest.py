@@ -0,0 +1,25 @@
+import os
+import shutil
+import sys
+from pathlib import Path
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# The app resolves db/ and sql/ relative to the repo root
+sys.path.insert(0, str(ROOT))
+os.chdir(ROOT)
+# Keep test runs out of the query history file
+os.environ.setdefault("QUERY_HISTORY_PATH", "")
+
+
+@pytest.fixture
+def db_copy(tmp_path, monkeypatch):
+    """Point every connection at a scratch copy of the sales database"""
+    from database import connection
+    path = tmp_path / "sales.duckdb"
+    shutil.copy(connection.DB_PATH, path)
+    if os.path.exists(connection.DB_PATH + ".wal"):
+        shutil.copy(connection.DB_PATH + ".wal", str(path) + ".wal")
+    monkeypatch.setattr(connection, "DB_PATH", str(path))
+    return str(path)
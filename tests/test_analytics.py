@@ -0,0 +1,45 @@
+from datetime import date, timedelta
+import pandas as pd
+from database import db_query, last_touch, open_work
+
+AS_OF = date(2026, 1, 10)
+
+
+def test_open_work_as_of_is_bounded_by_the_date():
+    frame = open_work(AS_OF).frame
+    assert not frame.empty
+    engage = pd.to_datetime(frame["engage_date"]).dt.date
+    assert engage.between(AS_OF - timedelta(days=30), AS_OF).all()
+    assert (pd.to_datetime(frame["last_activity_date"]).dropna().dt.date <= AS_OF).all()
+    assert (frame["deal_stage"] == "Engaging").all()
+    assert not frame.duplicated(["agent_key", "account_id"]).any()
+
+
+def test_agents_sharing_an_account_each_keep_their_item():
+    frame = open_work(AS_OF).frame
+    shared = frame.groupby("account_id")["agent_key"].nunique()
+    for account_id in shared[shared > 1].index[:3]:
+        agents = frame.loc[frame["account_id"] == account_id, "agent_key"]
+        for agent in agents:
+            assert account_id in set(open_work(AS_OF).for_agent(agent)["account_id"])
+
+
+def test_view_and_module_share_one_definition():
+    today = date.today()
+    view = db_query("SELECT agent_key, account_id, ts_interaction FROM v_open_work")
+    module = open_work(today).frame[["agent_key", "account_id", "ts_interaction"]]
+    key = ["agent_key", "account_id"]
+    pd.testing.assert_frame_equal(view.sort_values(key).reset_index(drop=True),
+                                  module.sort_values(key).reset_index(drop=True), check_dtype=False)
+    # Same rules at a date with data
+    macro = db_query("SELECT agent_key, account_id FROM open_work_as_of($d)", {"d": AS_OF})
+    assert set(map(tuple, macro.values)) == set(map(tuple, open_work(AS_OF).frame[key].values))
+
+
+def test_last_touch_ignores_later_interactions():
+    as_of = date(2025, 6, 30)
+    frame = last_touch(as_of).frame
+    assert (frame["last_touch"].dt.date <= as_of).all()
+    assert (frame["days_since_touch"] >= 0).all()
+    later = last_touch(date(2025, 12, 31)).frame
+    assert later["touch_count"].sum() > frame["touch_count"].sum()
@@ -0,0 +1,32 @@
+import json
+import pytest
+from pydantic import ValidationError
+from agent.daily_suggestions import _coerce
+
+SUGGESTION = {"title": "Call Acme", "rationale": "No touch in 30 days.", "actions": ["Email", "Call"]}
+
+
+def test_valid_object():
+    parsed = _coerce(json.dumps({"suggestions": [SUGGESTION] * 3}))
+    assert [s.model_dump() for s in parsed.suggestions] == [SUGGESTION] * 3
+
+
+def test_fenced_bare_array_with_extras_is_trimmed():
+    extra = {**SUGGESTION, "actions": ["Email", "Call", "Visit"]}
+    raw = "```json\n" + json.dumps([extra] * 4) + "\n```"
+    parsed = _coerce(raw)
+    assert len(parsed.suggestions) == 3
+    assert all(s.actions == ["Email", "Call"] for s in parsed.suggestions)
+
+
+@pytest.mark.parametrize("raw", [
+    "not json at all",
+    "",
+    json.dumps({"suggestions": [SUGGESTION] * 2}),
+    json.dumps({"suggestions": [{"title": "Only a title"}] * 3}),
+    json.dumps({"suggestions": [{**SUGGESTION, "actions": ["One"]}] * 3}),
+    json.dumps({"suggestions": [{**SUGGESTION, "priority": 1}] * 3}),
+])
+def test_invalid_raises_for_repair(raw):
+    with pytest.raises(ValidationError):
+        _coerce(raw)
@@ -0,0 +1,70 @@
+import threading
+import time
+import duckdb
+import pytest
+from database.execution import CancelToken, QueryCancelled, execute, query_scope
+
+# Runs for minutes unless interrupted
+SLOW_SQL = "SELECT count(*) FROM range(100000000) a, range(1000) b WHERE a.range + b.range < 0"
+
+
+@pytest.fixture
+def con():
+    con = duckdb.connect()
+    yield con
+    con.close()
+
+
+def _fetchone(cursor):
+    return cursor.fetchone()
+
+
+def _assert_usable(con):
+    assert execute(con, "SELECT 42", None, _fetchone) == (42,)
+
+
+def test_returns_result(con):
+    assert execute(con, "SELECT $x + 1", {"x": 1}, _fetchone, timeout=5) == (2,)
+
+
+def test_timeout_interrupts_query(con):
+    start = time.monotonic()
+    with pytest.raises(TimeoutError, match="time limit"):
+        execute(con, SLOW_SQL, None, _fetchone, timeout=0.3)
+    assert time.monotonic() - start < 5
+    _assert_usable(con)
+
+
+def test_cancel_from_another_thread_interrupts_query(con):
+    token = CancelToken()
+    threading.Timer(0.3, token.cancel, args=("stopped",)).start()
+    start = time.monotonic()
+    with query_scope(token), pytest.raises(QueryCancelled, match="Query stopped"):
+        execute(con, SLOW_SQL, None, _fetchone)
+    assert time.monotonic() - start < 5
+    _assert_usable(con)
+
+
+def test_cancelled_token_runs_nothing(con):
+    token = CancelToken()
+    token.cancel()
+    with query_scope(token), pytest.raises(QueryCancelled):
+        execute(con, "CREATE TABLE t AS SELECT 1", None, _fetchone)
+    assert con.execute("SELECT count(*) FROM duckdb_tables() WHERE table_name = 't'").fetchone() == (0,)
+
+
+class CallerStopped(Exception):
+    pass
+
+
+def test_caller_stopped_by_progress_callback_interrupts_query(con):
+    """An exception from on_progress (e.g. a Streamlit rerun) must not leave the scan running"""
+    def on_progress(percent):
+        raise CallerStopped
+
+    start = time.monotonic()
+    with query_scope(on_progress=on_progress), pytest.raises(CallerStopped):
+        execute(con, SLOW_SQL, None, _fetchone)
+    # execute only returns once the interrupted query has finished
+    assert time.monotonic() - start < 5
+    _assert_usable(con)
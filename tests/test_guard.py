@@ -0,0 +1,47 @@
+from database import guard_sql, unguard_sql, run_and_store, RESULT_ROW_LIMIT
+
+
+def test_large_result_is_wrapped_and_flagged():
+    sql, error, truncated = guard_sql("SELECT * FROM sales_pipeline;")
+    assert error == ""
+    assert truncated
+    assert sql.endswith(f"LIMIT {RESULT_ROW_LIMIT}")
+    assert unguard_sql(sql) == "SELECT * FROM sales_pipeline"
+
+
+def test_bounded_results_are_left_alone():
+    for query in ["SELECT * FROM sales_pipeline LIMIT 10",
+                  "SELECT COUNT(*) FROM sales_pipeline",
+                  "SELECT * FROM accounts WHERE sector = 'retail'"]:
+        assert guard_sql(query) == (query, "", False)
+        assert unguard_sql(query) == query
+
+
+def test_cross_join_is_rejected():
+    sql, error, truncated = guard_sql("SELECT * FROM sales_pipeline a, sales_pipeline b")
+    assert error.startswith("Query rejected")
+    assert not truncated
+
+
+def test_explain_error_is_returned():
+    _, error, truncated = guard_sql("SELECT nope FROM accounts")
+    assert "nope" in error
+    assert not truncated
+
+
+def test_union_sums_its_branches():
+    sql, error, truncated = guard_sql("SELECT * FROM sales_pipeline UNION ALL SELECT * FROM sales_pipeline")
+    assert error == ""
+    assert truncated
+    assert unguard_sql(sql) == "SELECT * FROM sales_pipeline UNION ALL SELECT * FROM sales_pipeline"
+
+
+def test_group_by_without_estimate_is_capped_but_not_reported_truncated():
+    # DuckDB has no group-count estimate, so the guard caps to be safe; the
+    # executed result shows nothing was cut
+    sql, error, capped = guard_sql("SELECT sales_agent, COUNT(*) AS deals FROM sales_pipeline GROUP BY sales_agent")
+    assert error == ""
+    assert capped
+    result = run_and_store(sql, capped=capped)
+    assert 0 < result.num_rows < RESULT_ROW_LIMIT
+    assert not result.truncated
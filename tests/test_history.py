@@ -0,0 +1,47 @@
+from database.history import normalize_sql, fingerprint
+
+
+def test_normalize_replaces_literals_and_folds_whitespace():
+    sql = "SELECT *\n  FROM sales_pipeline WHERE sales_agent = 'O''Brien' AND close_value > 1500.5;"
+    assert normalize_sql(sql) == "select * from sales_pipeline where sales_agent = ? and close_value > ?"
+
+
+def test_normalize_collapses_in_lists():
+    assert normalize_sql("SELECT * FROM t WHERE id IN (1, 2, 3)") == "select * from t where id in (?)"
+    assert normalize_sql("SELECT * FROM t WHERE id IN (7)") == "select * from t where id in (?)"
+
+
+def test_fingerprint_ignores_literals_but_not_shape():
+    a = fingerprint("SELECT * FROM accounts WHERE sector = 'retail' LIMIT 10")
+    b = fingerprint("select *  from accounts where sector = 'software' limit 50")
+    c = fingerprint("SELECT * FROM accounts WHERE office_location = 'retail' LIMIT 10")
+    assert a == b
+    assert a != c
+    assert len(a) == 16
+
+
+def test_identifiers_with_digits_are_kept():
+    assert normalize_sql("SELECT col1 FROM t2") == "select col1 from t2"
+
+
+def test_load_history_reads_pending_records_without_flushing(tmp_path, monkeypatch):
+    from database import history
+    path = tmp_path / "history.duckdb"
+    monkeypatch.setattr(history, "HISTORY_DB_PATH", str(path))
+    monkeypatch.setattr(history, "_start_flusher", lambda: None)
+    monkeypatch.setattr(history, "_buffer", history.deque())
+    history.record("SELECT 1", 0.01, rows=1)
+
+    loaded = history.load_history()
+    assert list(loaded["sql"]) == ["SELECT 1"]
+    assert not path.exists()
+
+    assert history.flush() == 1
+    loaded = history.load_history()
+    assert list(loaded["sql"]) == ["SELECT 1"]
+    assert loaded["plan_summary"].notna().all()
+
+
+def test_guard_wrapper_does_not_change_the_fingerprint():
+    sql = "SELECT * FROM sales_pipeline WHERE deal_stage = 'Won'"
+    assert fingerprint(f"SELECT * FROM (\n{sql}\n) AS guarded LIMIT 1000") == fingerprint(sql)
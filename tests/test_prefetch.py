@@ -0,0 +1,45 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from agent import prefetch
+from agent.prefetch import Prefetcher
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    """Replace the snapshot loader with one that records (agent, workload)"""
+    calls = []
+
+    def loader(sales_agent, workload="interactive"):
+        calls.append((sales_agent, workload))
+        return f"snapshot for {sales_agent}"
+
+    monkeypatch.setattr(prefetch, "PREFETCH_TASKS", {"snapshot": loader})
+    monkeypatch.setattr(prefetch, "WARM_TASKS", {})
+    return calls
+
+
+def test_prefetch_runs_as_batch_and_is_reused(calls):
+    p = Prefetcher()
+    p.warm("Anna Snelling")
+    assert p.get("snapshot", "Anna Snelling") == "snapshot for Anna Snelling"
+    assert calls == [("Anna Snelling", "batch")]
+
+
+def test_miss_is_computed_inline_as_interactive(calls):
+    p = Prefetcher()
+    assert p.get("snapshot", "Anna Snelling") == "snapshot for Anna Snelling"
+    assert calls == [("Anna Snelling", "interactive")]
+
+
+def test_load_still_queued_is_computed_inline(calls, monkeypatch):
+    busy = threading.Event()
+    executor = ThreadPoolExecutor(max_workers=1)
+    executor.submit(busy.wait, 2)  # another session's load holds the only worker
+    monkeypatch.setattr(prefetch, "_EXECUTOR", executor)
+    p = Prefetcher()
+    p.warm("Anna Snelling")
+    assert p.get("snapshot", "Anna Snelling") == "snapshot for Anna Snelling"
+    busy.set()
+    executor.shutdown(wait=True)
+    assert calls == [("Anna Snelling", "interactive")]
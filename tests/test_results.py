@@ -0,0 +1,53 @@
+import os
+import time
+import duckdb
+import pytest
+from database import db_query, guard_sql, run_and_store, get_result, export_query, RESULT_ROW_LIMIT
+from database import results
+
+
+def test_capped_result_holds_the_cap_and_exports_everything(tmp_path):
+    full = db_query("SELECT COUNT(*) AS n FROM sales_pipeline")["n"].iloc[0]
+    assert full > RESULT_ROW_LIMIT
+
+    sql, _, capped = guard_sql("SELECT * FROM sales_pipeline")
+    result = run_and_store(sql, capped=capped)
+    assert get_result(result.result_id) is result
+    assert result.truncated
+    assert result.num_rows == RESULT_ROW_LIMIT
+    assert result.num_pages(100) == RESULT_ROW_LIMIT // 100
+    assert result.page(result.num_pages(100) - 1, 100).num_rows == 100
+    assert result.export_sql == "SELECT * FROM sales_pipeline"
+
+    path, rows = export_query(result.export_sql, "parquet", str(tmp_path / "all.parquet"))
+    assert rows == full
+    assert duckdb.sql(f"SELECT COUNT(*) FROM '{path}'").fetchone()[0] == full
+
+
+def test_uncapped_result_is_held_whole():
+    result = run_and_store("SELECT * FROM sales_pipeline LIMIT 10")
+    assert not result.truncated
+    assert result.num_rows == 10
+    assert result.export_sql == result.sql
+
+
+def test_export_times_out_and_leaves_no_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(results, "EXPORT_TIMEOUT_SECONDS", 0.3)
+    path = tmp_path / "slow.csv"
+    with pytest.raises(TimeoutError):
+        export_query("SELECT COUNT(*) FROM range(100000000) a, range(1000) b", "csv", str(path))
+    assert not path.exists()
+
+
+def test_old_exports_are_removed(tmp_path, monkeypatch):
+    monkeypatch.setattr(results, "EXPORT_DIR", str(tmp_path))
+    old, new = tmp_path / "old.csv", tmp_path / "new.csv"
+    for f in (old, new):
+        f.write_text("x\n")
+    stale = time.time() - results.EXPORT_TTL_SECONDS - 60
+    os.utime(old, (stale, stale))
+    path, rows = export_query("SELECT 1 AS x", "csv")
+    assert not old.exists()
+    assert new.exists()
+    assert os.path.dirname(path) == str(tmp_path)
+    assert rows == 1
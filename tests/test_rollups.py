@@ -0,0 +1,56 @@
+from database import connection, refresh_rollups
+
+
+def _rollup(con):
+    return con.execute("SELECT * FROM rollup_pipeline_monthly").fetchall()
+
+
+def _differences(path):
+    """Rows that differ between the incrementally maintained rollup and a full rebuild"""
+    con = connection.connect(read_only=False)
+    try:
+        incremental = _rollup(con)
+        con.execute("DROP TABLE rollup_pipeline_monthly")
+        con.execute("DROP TABLE rollup_meta.pipeline_monthly_state")
+    finally:
+        con.close()
+    refresh_rollups()
+    con = connection.connect(read_only=True)
+    try:
+        full = _rollup(con)
+    finally:
+        con.close()
+    return set(incremental) ^ set(full)
+
+
+def _execute(sql):
+    con = connection.connect(read_only=False)
+    try:
+        con.execute(sql)
+    finally:
+        con.close()
+
+
+def test_refresh_without_changes_rewrites_nothing(db_copy):
+    refresh_rollups()
+    assert refresh_rollups() == 0
+
+
+def test_dimension_change_reaches_every_month(db_copy):
+    refresh_rollups()
+    # An account with deals in many months, some with an even number of deals
+    _execute("UPDATE accounts SET sector = 'changed sector' WHERE account_id = 1000")
+    assert refresh_rollups() > 0
+    assert _differences(db_copy) == set()
+
+
+def test_deal_changes_and_deletes_match_a_full_rebuild(db_copy):
+    refresh_rollups()
+    _execute("""
+        UPDATE sales_pipeline SET close_value = close_value + 1
+        WHERE opportunity_id IN (SELECT opportunity_id FROM sales_pipeline ORDER BY opportunity_id LIMIT 25);
+        DELETE FROM sales_pipeline
+        WHERE opportunity_id IN (SELECT opportunity_id FROM sales_pipeline ORDER BY opportunity_id DESC LIMIT 25);
+    """)
+    assert refresh_rollups() > 0
+    assert _differences(db_copy) == set()
@@ -0,0 +1,100 @@
+from types import SimpleNamespace
+import pytest
+from agent import routing
+from agent.routing import ModelRoute, choose_route, question_complexity
+
+LOCAL = ModelRoute("local", "llama3.1:8b", "http://127.0.0.1:11434/v1")
+SIMPLE = "How many deals did Anna Snelling win?"
+COMPLEX = "Compare win rate by sector over time"
+
+
+@pytest.fixture
+def local_tier(monkeypatch):
+    """Configure a local server, as LLM_LOCAL_BASE_URL would"""
+    monkeypatch.setitem(routing.TIERS, "local", LOCAL)
+
+
+@pytest.fixture
+def no_local_tier(monkeypatch):
+    monkeypatch.setitem(routing.TIERS, "local", ModelRoute("local", "llama3.1:8b", None))
+
+
+@pytest.mark.parametrize("question, expected", [
+    ("", "simple"),
+    (SIMPLE, "simple"),
+    ("Which sector has the most accounts?", "simple"),
+    (COMPLEX, "complex"),
+    ("Top 5 products? And their growth?", "complex"),
+    ("How many deals " + "were won " * 20 + "?", "complex"),
+])
+def test_question_complexity(question, expected):
+    assert question_complexity(question) == expected
+
+
+def test_simple_sql_starts_on_local_tier(local_tier):
+    route, reason = choose_route("sql", SIMPLE)
+    assert route.tier == "local"
+    assert reason == "simple"
+
+
+def test_complex_sql_starts_on_fast_tier(local_tier):
+    route, reason = choose_route("sql", COMPLEX)
+    assert route.tier == "fast"
+    assert reason == "complex"
+
+
+@pytest.mark.parametrize("call_type", ["sql", "suggestions_repair"])
+def test_local_tier_skipped_when_not_configured(no_local_tier, call_type):
+    assert choose_route(call_type, SIMPLE)[0].tier == "fast"
+    # Escalation counts from the first configured tier
+    assert choose_route(call_type, SIMPLE, failures=1)[0].tier == "strong"
+
+
+def test_each_failure_escalates_one_tier_up_to_strong(local_tier):
+    tiers = [choose_route("sql", SIMPLE, failures=n, last_error="timeout")[0].tier for n in range(4)]
+    assert tiers == ["local", "fast", "strong", "strong"]
+    assert choose_route("sql", SIMPLE, failures=2, last_error="timeout")[1] == "simple, escalated after 2 failure(s)"
+
+
+@pytest.mark.parametrize("error", [
+    'Binder Error: Referenced column "amount" not found in FROM clause!',
+    "Catalog Error: Table with name deals does not exist!",
+    "Unknown table or view: deals",
+])
+def test_name_fix_retry_does_not_escalate(local_tier, error):
+    route, reason = choose_route("sql", SIMPLE, failures=1, last_error=error)
+    assert route.tier == "local"
+    assert reason == "simple, name-fix retry"
+    # Only the last failure is forgiven
+    assert choose_route("sql", SIMPLE, failures=2, last_error=error)[0].tier == "fast"
+
+
+@pytest.fixture
+def fake_client(monkeypatch):
+    """Replace the API with one that answers every call with a new response id"""
+    ids = iter(range(1000))
+
+    def create(**kwargs):
+        return SimpleNamespace(id=f"resp-{next(ids)}")
+
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    monkeypatch.setattr(routing, "get_client", lambda base_url=None: client)
+    monkeypatch.setattr(routing, "ROUTING_LOG", routing.deque(maxlen=2000))
+    monkeypatch.setattr(routing, "ROUTING_LOG_PATH", None)
+
+
+def test_summary_shows_invalid_output_per_tier(local_tier, fake_client):
+    messages = [{"role": "user", "content": "SELECT"}]
+    bad = routing.chat_completion("sql", messages, question=SIMPLE)
+    routing.report_validation(bad, False)
+    good = routing.chat_completion("sql", messages, question=SIMPLE, failures=1, last_error="timeout")
+    routing.report_validation(good, True)
+    routing.chat_completion("agent", messages, question=SIMPLE)  # output not checked
+
+    summary = routing.routing_summary().set_index("tier")
+    assert summary.loc["local", "invalid_rate"] == 1.0
+    sql_fast = summary[summary.call_type == "sql"].loc["fast"]
+    assert sql_fast.invalid_rate == 0.0
+    agent = summary[summary.call_type == "agent"].iloc[0]
+    assert agent.validated == 0
+    assert agent.failure_rate == 0.0
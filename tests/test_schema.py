@@ -0,0 +1,18 @@
+from database import connection, get_schema_info, get_relation_names
+
+
+def test_enum_columns_are_listed_without_their_values():
+    schema = get_schema_info()
+    assert "ENUM(" not in schema
+    assert "  - deal_stage (ENUM) [examples:" in schema
+
+
+def test_schema_caches_follow_reloads(db_copy):
+    assert "reloaded_table" not in get_relation_names()
+    con = connection.connect(read_only=False)
+    try:
+        con.execute("CREATE TABLE reloaded_table AS SELECT 1 AS x")
+    finally:
+        con.close()
+    assert "reloaded_table" in get_relation_names()
+    assert "TABLE: reloaded_table" in get_schema_info()
@@ -0,0 +1,64 @@
+import hashlib
+import numpy as np
+import pytest
+from database import connection, search
+
+faiss = pytest.importorskip("faiss")
+
+
+def _fake_embed(texts):
+    """Deterministic unit vectors per text, standing in for the embedding API"""
+    vectors = []
+    for text in texts:
+        seed = int(hashlib.md5(text.encode()).hexdigest()[:8], 16)
+        vectors.append(np.random.default_rng(seed).standard_normal(16))
+    matrix = np.asarray(vectors, dtype="float32")
+    return matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+
+
+@pytest.fixture
+def index_path(db_copy, tmp_path, monkeypatch):
+    monkeypatch.setattr(search, "SEARCH_INDEX_PATH", str(tmp_path / "comments.faiss"))
+    monkeypatch.setattr(search, "_embed", _fake_embed)
+    return tmp_path / "comments.faiss"
+
+
+def _execute(sql):
+    con = connection.connect(read_only=False)
+    try:
+        return con.execute(sql).fetchall()
+    finally:
+        con.close()
+
+
+def _indexed_ids(path):
+    index = faiss.read_index(str(path))  # keep alive while its id_map is read
+    return set(faiss.vector_to_array(index.id_map).tolist())
+
+
+def _live_ids():
+    rows = _execute("SELECT interaction_id FROM interactions WHERE TRIM(COALESCE(comment, '')) <> ''")
+    return {r[0] for r in rows}
+
+
+def test_changed_and_removed_comments_leave_the_index(index_path):
+    embedded = search.refresh_search_index()
+    assert embedded == len(_live_ids())
+    assert search.refresh_search_index() == 0
+
+    # A changed comment gets a new id, as a reload recomputes the content hash
+    old_id, removed_id = [r[0] for r in _execute("SELECT interaction_id FROM interactions ORDER BY 1 LIMIT 2")]
+    _execute(f"""
+        UPDATE interactions SET comment = 'Rewritten note', interaction_id = 42 WHERE interaction_id = {old_id};
+        DELETE FROM interactions WHERE interaction_id = {removed_id};
+    """)
+    assert search.refresh_search_index() == 1
+    assert _indexed_ids(index_path) == _live_ids()
+    assert {old_id, removed_id}.isdisjoint(_indexed_ids(index_path))
+
+
+def test_semantic_search_fills_the_limit_after_removals(index_path):
+    search.refresh_search_index()
+    _execute("DELETE FROM interactions WHERE interaction_id IN (SELECT interaction_id FROM interactions LIMIT 100)")
+    search.refresh_search_index()
+    assert len(search.semantic_search("pricing concerns", limit=10)) == 10
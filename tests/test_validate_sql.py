@@ -0,0 +1,59 @@
+import pytest
+from agent.text_to_sql import validate_sql
+from database import parse_sql, referenced_relations
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT * FROM accounts",
+    "SELECT * FROM main.accounts",
+    "SELECT * FROM v_open_work JOIN rollup_pipeline_monthly USING (agent_key)",
+    "WITH x AS (SELECT * FROM accounts) SELECT * FROM x",
+    "SELECT * FROM range(10)",
+    "SELECT * FROM generate_series(1, 3)",
+    "SELECT UNNEST([1, 2, 3])",
+    # Keywords inside identifiers and literals are not statements
+    "SELECT account AS created_at, 'x' AS updated_by, 'DELETE FROM accounts' AS note FROM accounts",
+    "SELECT * FROM accounts WHERE account_id IN (SELECT account_id FROM sales_pipeline)",
+])
+def test_allowed(sql):
+    assert validate_sql(sql) == (True, "")
+
+
+@pytest.mark.parametrize("sql, message", [
+    ("SELECT 1; SELECT 2", "exactly one SELECT"),
+    ("SELECT * FROM accounts; DROP TABLE accounts", "Only SELECT"),
+    ("DELETE FROM accounts", "Only SELECT"),
+    ("DROP TABLE accounts", "Only SELECT"),
+    ("INSERT INTO accounts SELECT * FROM accounts", "Only SELECT"),
+    ("COPY accounts TO 'x.csv'", "Only SELECT"),
+    ("ATTACH 'x.db'", "Only SELECT"),
+    ("PRAGMA database_list", "Only SELECT"),
+    ("SELECT * FROM read_csv('data/accounts.csv')", "Table function not allowed: read_csv"),
+    ("SELECT * FROM read_csv_auto('data/accounts.csv')", "Table function not allowed"),
+    ("SELECT * FROM glob('*')", "Table function not allowed: glob"),
+    ("SELECT * FROM duckdb_settings()", "Table function not allowed"),
+    ("SELECT * FROM (SELECT 1) t, LATERAL (SELECT * FROM read_text('x'))", "Table function not allowed"),
+    ("SELECT * FROM 'data/accounts.csv'", "Unknown table"),
+    ("SELECT * FROM information_schema.tables", "Unknown table"),
+    ("SELECT * FROM rollup_meta.pipeline_monthly_state", "Unknown table"),
+    ("SELECT * FROM other_db.main.accounts", "Unknown table"),
+    ("SELECT * FROM nope", "Unknown table"),
+    ("WITH x AS (SELECT * FROM secrets) SELECT * FROM x", "Unknown table"),
+    ("SELECT * FROM accounts WHERE account_id IN (SELECT account_id FROM secrets)", "Unknown table"),
+    ("SELEC * FROM accounts", "parse error"),
+])
+def test_denied(sql, message):
+    ok, error = validate_sql(sql)
+    assert not ok
+    assert message in error
+
+
+def test_referenced_relations_collects_tables_functions_and_ctes():
+    tree = parse_sql(
+        "WITH recent AS (SELECT * FROM Sales_Pipeline) "
+        "SELECT * FROM recent JOIN main.accounts USING (account_id), range(3)"
+    )["statements"][0]
+    tables, functions, ctes = referenced_relations(tree)
+    assert tables == {("", "sales_pipeline"), ("", "recent"), ("main", "accounts")}
+    assert functions == {"range"}
+    assert ctes == {"recent"}
@@ -1,17 +1,20 @@
+import os
 import sys
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
 from pathlib import Path
 sys.path.append(str(Path(__file__).parent))
 
 import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 from agent import (
     agent_answer,
-    open_work_handler,
-    text_to_sql_handler,
     get_daily_suggestions,
-    Tool,
-    register_tool
+    Prefetcher,
+    register_default_tools
 )
-from database import db_query
+from database import db_query, get_result, take_recent_results, start_export, CancelToken
 
 # ---------------------------------------------------------------------------
 # Brand constants
@@ -107,42 +110,8 @@ def get_sales_agents() -> list:
         return ["Unknown"]
 
 
-# Register the text_to_sql tool
-register_tool(Tool(
-    name="text_to_sql",
-    description="Generate and execute SQL queries from natural language questions about the sales database. Use this for flexible, ad-hoc queries about accounts, deals, interactions, products, and sales teams.",
-    parameters={
-        "type": "object",
-        "properties": {
-            "question": {
-                "type": "string",
-                "description": "The natural language question to convert to SQL."
-            }
-        },
-        "required": ["question"]
-    },
-    handler=text_to_sql_handler
-))
-
-# Register the open_work tool
-register_tool(Tool(
-    name="open_work",
-    description="Get a list of outstanding work items and tasks that need attention. This shows deals in 'Engaging' stage from the last 30 days. Use this for questions about 'what to work on', 'outstanding items', 'tasks today', or 'open work'.",
-    parameters={
-        "type": "object",
-        "properties": {
-            "limit": {
-                "type": "integer",
-                "description": "Maximum number of items to return (default: 25)"
-            },
-            "sales_agent": {
-                "type": "string",
-                "description": "Optional: filter by sales agent name"
-            }
-        }
-    },
-    handler=open_work_handler
-))
+# Register the agent's tools (text_to_sql, open_work, search_notes)
+register_default_tools()
 
 
 # ---------------------------------------------------------------------------
@@ -178,6 +147,12 @@ with st.sidebar:
     )
 
     st.session_state.current_user = selected_agent
+
+    # Start loading this agent's snapshot, open work and the schema prompt in
+    # the background so suggestions and the first question find warm data
+    if "prefetcher" not in st.session_state:
+        st.session_state.prefetcher = Prefetcher()
+    st.session_state.prefetcher.warm(selected_agent)
     st.markdown(f"Logged in as **{selected_agent}**")
 
     st.divider()
@@ -198,10 +173,14 @@ with st.sidebar:
 # ---------------------------------------------------------------------------
 # Daily Suggestions
 # ---------------------------------------------------------------------------
-def load_suggestions():
+def load_suggestions(refresh: bool = False):
     """Fetch fresh suggestions for the current user."""
     user = st.session_state.get("current_user", "Unknown")
-    st.session_state.daily_suggestions = get_daily_suggestions(user)
+    if refresh:
+        # Rebuild the snapshot rather than reusing the prefetched one
+        st.session_state.prefetcher.cancel(user)
+    snapshot = st.session_state.prefetcher.get("snapshot", user)
+    st.session_state.daily_suggestions = get_daily_suggestions(user, snapshot=snapshot)
     st.session_state.suggestions_user = user
 
 
@@ -226,14 +205,98 @@ for idx, col in enumerate(suggestion_cols):
 
 if st.button("Refresh Suggestions"):
     with st.spinner("Generating new suggestions..."):
-        load_suggestions()
+        load_suggestions(refresh=True)
     st.rerun()
 
 st.divider()
 
+# ---------------------------------------------------------------------------
+# Query results
+# ---------------------------------------------------------------------------
+RESULT_PAGE_SIZE = 50
+
+
+def render_result(result_id: str):
+    """Paged table for a stored query result, with CSV/Parquet export"""
+    result = get_result(result_id)
+    if result is None:
+        st.caption("This result has expired; ask again to re-run the query.")
+        return
+
+    size = f"first {result.num_rows:,} rows" if result.truncated else f"{result.num_rows:,} rows"
+    with st.expander(f"Query result ({size})", expanded=True):
+        pages = result.num_pages(RESULT_PAGE_SIZE)
+        page = 1
+        if pages > 1:
+            page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages,
+                                   value=1, key=f"page_{result_id}")
+        st.dataframe(result.page(page - 1, RESULT_PAGE_SIZE).to_pandas(),
+                     width="stretch", hide_index=True)
+        if result.truncated:
+            st.caption(f"The result was truncated at {result.num_rows:,} rows. "
+                       f"Export it to get every row.")
+
+        # Exports run in the background; the download appears on a later rerun
+        exports = st.session_state.setdefault("exports", {})
+        cols = st.columns(2)
+        for col, fmt in zip(cols, ("csv", "parquet")):
+            with col:
+                key = (result_id, fmt)
+                future = exports.get(key)
+                if future is None:
+                    if st.button(f"Export {fmt.upper()}", key=f"export_{fmt}_{result_id}"):
+                        exports[key] = start_export(result.export_sql, fmt)
+                        st.rerun()
+                elif not future.done():
+                    st.caption(f"Preparing {fmt.upper()}...")
+                    if st.button("Check again", key=f"check_{fmt}_{result_id}"):
+                        st.rerun()
+                elif future.exception():
+                    st.caption(f"Export failed: {future.exception()}")
+                else:
+                    path, rows = future.result()
+                    if not os.path.exists(path):
+                        # Old exports are cleaned up; export again
+                        del exports[key]
+                        st.rerun()
+                    with open(path, "rb") as f:
+                        st.download_button(f"Download {fmt.upper()} ({rows:,} rows)", f,
+                                           file_name=f"query_result.{fmt}",
+                                           key=f"download_{fmt}_{result_id}")
+
+
 # ---------------------------------------------------------------------------
 # Chat
 # ---------------------------------------------------------------------------
+# How often the page checks on a running answer; each check is a Streamlit
+# call, which is where a pending rerun (Stop, a new question) takes effect
+ANSWER_POLL_SECONDS = 0.25
+
+
+def start_answer(question: str, token: CancelToken, status: dict) -> Future:
+    """
+    Run agent_answer on its own thread so the script thread stays free to
+    notice Stop. The future resolves to (reply, result ids); query progress
+    is written to status["progress"] as (percent, time).
+    """
+    future = Future()
+
+    def run():
+        take_recent_results()
+        try:
+            reply = agent_answer(question, cancel_token=token,
+                                 on_progress=lambda percent: status.update(progress=(percent, time.monotonic())))
+            future.set_result((reply, take_recent_results()))
+        except BaseException as e:
+            future.set_exception(e)
+
+    thread = threading.Thread(target=run, name="agent-answer", daemon=True)
+    # Tools read the current user from session state
+    add_script_run_ctx(thread, get_script_run_ctx())
+    thread.start()
+    return future
+
+
 if "messages" not in st.session_state:
     st.session_state.messages = [
         {
@@ -243,9 +306,16 @@ if "messages" not in st.session_state:
         }
     ]
 
+# Any rerun while an answer is being generated (Stop, a new question, leaving)
+# cancels that answer's token, which interrupts its query
+if st.session_state.pop("answer_in_progress", False):
+    st.session_state.messages.append({"role": "assistant", "content": "Stopped."})
+
 for msg in st.session_state.messages:
     with st.chat_message(msg["role"]):
         st.markdown(msg["content"])
+        for result_id in msg.get("results", []):
+            render_result(result_id)
 
 user_question = st.chat_input("Ask a question about your sales data...")
 if user_question:
@@ -254,8 +324,38 @@ if user_question:
         st.markdown(user_question)
 
     with st.chat_message("assistant"):
-        with st.spinner("Thinking..."):
-            reply = agent_answer(user_question)
-            st.markdown(reply)
-
-    st.session_state.messages.append({"role": "assistant", "content": reply})
+        # Clicking triggers the rerun that stops this one
+        stop = st.empty()
+        stop.button("Stop", key="stop_button")
+        progress = st.empty()
+
+        token = CancelToken()
+        status = {"progress": None}
+        st.session_state.answer_in_progress = True
+        future = start_answer(user_question, token, status)
+        try:
+            while True:
+                try:
+                    reply, results = future.result(timeout=ANSWER_POLL_SECONDS)
+                    break
+                except FutureTimeout:
+                    pass
+                percent, updated = status["progress"] or (None, 0)
+                if percent is not None and time.monotonic() - updated < 2 * ANSWER_POLL_SECONDS:
+                    progress.caption(f"Running query... {percent:.0f}%" if percent >= 0 else "Running query...")
+                else:
+                    progress.caption("Thinking...")
+        finally:
+            if future.done():
+                # Answered, or failed with the error raised above: either way not stopped
+                st.session_state.answer_in_progress = False
+            else:
+                # A rerun was raised from the caption update above
+                token.cancel("stopped")
+        stop.empty()
+        progress.empty()
+        st.markdown(reply)
+        for result_id in results:
+            render_result(result_id)
+
+    st.session_state.messages.append({"role": "assistant", "content": reply, "results": results})